@@ -0,0 +1,213 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from utils.batching import get_prediction_batcher
+from utils.fast_encoder import get_fast_encoder
+from utils.model_registry import get_registry
+from utils.scoring import align_to_schema, predict_record, score_frame
+from utils.tree_engine import get_tree_models
+from utils.warmup import get_warm_up
+
+# Latency targets for the scoring service, measured inside the service (excludes network).
+# Single-record requests: p50 <= 25 ms, p99 <= 100 ms.
+# Batch requests of up to 1,000 records: p50 <= 250 ms, p99 <= 1,000 ms.
+LATENCY_TARGETS_MS = {
+    'predict': {'p50': 25, 'p99': 100},
+    'predict_batch': {'p50': 250, 'p99': 1000},
+}
+
+# Largest batch accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.getenv("SCORING_MAX_BATCH_SIZE", "10000"))
+
+# The model bundle shared with the Streamlit pages (MODEL_BUNDLE_PATH or the current build)
+registry = get_registry()
+
+# Coalesces concurrent /predict requests into vectorized calls (None when disabled)
+batcher = get_prediction_batcher(registry)
+
+# Loads the bundle, encoder and dataset and scores dummy records with every model
+warm_up = get_warm_up(registry.path)
+
+
+# Function to start the warm-up when the service starts; /ready reports when it is done
+# (it runs in the background so /health and /ready answer meanwhile)
+@asynccontextmanager
+async def lifespan(app):
+    warm_up.start()
+    yield
+
+
+app = FastAPI(
+    title="Churn Scoring Service",
+    description="Scores customers with the same preprocessor and tuned models as the Streamlit app.",
+    lifespan=lifespan,
+)
+
+
+# Customer attributes; fields default to the values in utils.scoring.expected_columns
+class Customer(BaseModel):
+    Gender: str = 'Male'
+    Senior_Citizen: str = 'No'
+    Partner: str = 'No'
+    Dependents: str = 'No'
+    tenure: int = 0
+    Phone_Service: str = 'No'
+    Multiple_Lines: str = 'No phone service'
+    Internet_Service: str = 'DSL'
+    Online_Security: str = 'No internet service'
+    Online_Backup: str = 'No internet service'
+    Device_Protection: str = 'No internet service'
+    Tech_Support: str = 'No internet service'
+    Streaming_TV: str = 'No internet service'
+    Streaming_Movies: str = 'No internet service'
+    Contract: str = 'Month-to-month'
+    Paperless_Billing: str = 'No'
+    Payment_Method: str = 'Electronic check'
+    Monthly_Charges: float = 0.0
+    Total_Charges: float = 0.0
+
+
+class PredictRequest(BaseModel):
+    customer: Customer
+    model: str = 'random_forest'
+
+
+class BatchPredictRequest(BaseModel):
+    customers: list[Customer]
+    model: str = 'random_forest'
+
+
+class Prediction(BaseModel):
+    prediction: int
+    label: str
+    probability: float
+
+
+class BatchPrediction(BaseModel):
+    model: str
+    predictions: list[Prediction]
+
+
+class LatencyTracker:
+    # Keeps the most recent request latencies per endpoint for percentile reporting
+
+    def __init__(self, window=10_000):
+        self._samples = {}
+        self.window = window
+
+    def record(self, endpoint, seconds):
+        self._samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds * 1000)
+
+    def summary(self):
+        summary = {}
+        for endpoint, samples in self._samples.items():
+            values = np.fromiter(samples, dtype=float)
+            summary[endpoint] = {
+                'count': len(values),
+                'p50_ms': float(np.percentile(values, 50)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'target_ms': LATENCY_TARGETS_MS.get(endpoint),
+            }
+        return summary
+
+
+latency = LatencyTracker()
+
+
+# Function to look up the preprocessor and a tuned model, raising 404 for unknown models
+# (random_forest and xgboost come from the compiled tree engine when enabled and verified)
+def get_model(model_name):
+    components = registry.get()
+    models, _ = get_tree_models(registry)
+    if model_name not in models:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{model_name}'. Available: {sorted(models)}")
+    return components['preprocessing']['preprocessor'], models[model_name]
+
+
+def to_prediction(prediction, probability):
+    prediction = int(prediction)
+    return Prediction(
+        prediction=prediction,
+        label='Churn' if prediction == 1 else 'No Churn',
+        probability=float(probability),
+    )
+
+
+# Health of the service: 503 with the error when the model bundle cannot be loaded
+@app.get("/health")
+async def health():
+    try:
+        components = await run_in_threadpool(registry.get)
+    except Exception as e:
+        return JSONResponse({"status": "unhealthy", "error": f"{type(e).__name__}: {e}"}, status_code=503)
+    return {"status": "ok", "models": sorted(components['tuned_models']), "bundle_version": registry.version}
+
+
+# Readiness for the load balancer: 503 until the warm-up has finished
+@app.get("/ready")
+async def ready():
+    status = warm_up.status()
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+
+@app.get("/metrics/latency")
+async def latency_metrics():
+    return latency.summary()
+
+
+@app.get("/metrics/batching")
+async def batching_metrics():
+    return batcher.metrics() if batcher is not None else {"enabled": False}
+
+
+@app.post("/predict", response_model=Prediction)
+async def predict(request: PredictRequest):
+    start = time.perf_counter()
+    # Loading, verifying and compiling the bundle can take seconds on the first request
+    # or after a reload, so it runs in the threadpool like the scoring itself
+    preprocessor, model = await run_in_threadpool(get_model, request.model)
+    record = request.customer.model_dump()
+    if batcher is not None:
+        prediction, probability = await asyncio.wrap_future(batcher.submit(record, request.model))
+    else:
+        # Run sklearn/xgboost in the threadpool so the event loop stays free
+        encoder, _ = await run_in_threadpool(get_fast_encoder, registry)
+        prediction, probability = await run_in_threadpool(predict_record, record, preprocessor, model, encoder)
+    latency.record('predict', time.perf_counter() - start)
+    return to_prediction(prediction, probability)
+
+
+@app.post("/predict/batch", response_model=BatchPrediction)
+async def predict_batch(request: BatchPredictRequest):
+    if len(request.customers) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds the limit of {MAX_BATCH_SIZE} records.")
+    start = time.perf_counter()
+    preprocessor, model = await run_in_threadpool(get_model, request.model)
+    if not request.customers:
+        return BatchPrediction(model=request.model, predictions=[])
+    df = pd.DataFrame([customer.model_dump() for customer in request.customers])
+    aligned, _ = align_to_schema(df)
+    labels, churn_prob = await run_in_threadpool(score_frame, aligned, preprocessor, model)
+    probabilities = np.where(labels == 1, churn_prob, 1 - churn_prob)
+    latency.record('predict_batch', time.perf_counter() - start)
+    return BatchPrediction(
+        model=request.model,
+        predictions=[to_prediction(label, prob) for label, prob in zip(labels, probabilities)],
+    )
+
+
+# Run the scoring service directly with: python api.py
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run("api:app", host=os.getenv("SCORING_API_HOST", "0.0.0.0"), port=int(os.getenv("SCORING_API_PORT", "8000")))
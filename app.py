@@ -1,45 +1,25 @@
 import streamlit as st
 import hashlib
-import json
-import os
+from utils.user_store import get_user_store
 
 # Function to hash passwords
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-# Function to load user data
-def load_user_data():
-    if os.path.exists('users.json'):
-        with open('users.json', 'r') as f:
-            return json.load(f)
-    return {"users": []}
-
-# Function to save user data
-def save_user_data(user_data):
-    with open('users.json', 'w') as f:
-        json.dump(user_data, f)
-
 # Function to create a new user
 def create_user(username, password):
-    user_data = load_user_data()
-    for user in user_data["users"]:
-        if user["username"] == username:
-            st.warning("Username already exists.")
-            return False
     hashed_password = hash_password(password)
-    user_data["users"].append({"username": username, "password": hashed_password})
-    save_user_data(user_data)
+    # The insert fails atomically if the username is already taken
+    if not get_user_store().create_user(username, hashed_password):
+        st.warning("Username already exists.")
+        return False
     st.success("Account created successfully.")
     return True
 
 # Function to authenticate user
 def authenticate_user(username, password):
-    user_data = load_user_data()
-    hashed_password = hash_password(password)
-    for user in user_data["users"]:
-        if user["username"] == username and user["password"] == hashed_password:
-            return True
-    return False
+    stored_hash = get_user_store().get_password_hash(username)
+    return stored_hash is not None and stored_hash == hash_password(password)
 
 # Main application
 def main():
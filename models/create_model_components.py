@@ -1,22 +1,109 @@
+import argparse
+import os
+import sys
+
 import joblib
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.exceptions import NotFittedError
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.utils.validation import check_is_fitted
 
-# Load the pre-trained models
-svm_model = joblib.load(r"C:\Users\Etebom\Documents\streamlit\churn_prediction_app\models\Churn_svm_model.pkl")
-rf_model = joblib.load(r"C:\Users\Etebom\Documents\streamlit\churn_prediction_app\models\Churn_rf_model.pkl")
-xgb_model = joblib.load(r"C:\Users\Etebom\Documents\streamlit\churn_prediction_app\models\Churn_xgb_model.pkl")
-knn_model = joblib.load(r"C:\Users\Etebom\Documents\streamlit\churn_prediction_app\models\Churn_knn_model.pkl")
-
-# Create a dictionary to hold the models
-components = {
-    'tuned_models': {
-        'svm': svm_model,
-        'random_forest': rf_model,
-        'xgboost': xgb_model,
-        'knn': knn_model,
-    }
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, main_dir)
+
+from utils.datasets import DEFAULT_DATASET_PATH, file_sha256  # noqa: E402
+from utils.model_bundle import write_bundle  # noqa: E402
+from utils.model_registry import BUNDLES_DIR, MMAP_MODE  # noqa: E402
+from utils.scoring import dataset_to_expected, expected_columns  # noqa: E402
+
+# Tuned model files in models/, by the name the app uses for them
+MODEL_FILES = {
+    'svm': 'Churn_svm_model.pkl',
+    'random_forest': 'Churn_rf_model.pkl',
+    'xgboost': 'Churn_xgb_model.pkl',
+    'knn': 'Churn_knn_model.pkl',
 }
+NUMERIC_COLUMNS = ['tenure', 'Monthly_Charges', 'Total_Charges']
+
+
+# Function to build the preprocessing pipeline: impute and scale numbers, impute and one-hot encode categories
+def build_preprocessor():
+    categorical = [col for col in expected_columns if col not in NUMERIC_COLUMNS]
+    return ColumnTransformer([
+        ('num', Pipeline([('imputer', SimpleImputer(strategy='median')), ('scaler', StandardScaler())]), NUMERIC_COLUMNS),
+        ('cat', Pipeline([('imputer', SimpleImputer(strategy='most_frequent')), ('onehot', OneHotEncoder(handle_unknown='ignore'))]), categorical),
+    ])
+
+
+# Function to check whether an estimator was saved after fitting
+def is_fitted(estimator):
+    try:
+        check_is_fitted(estimator)
+        return True
+    except NotFittedError:
+        return False
+
 
-# Save the components as a pickle file
-joblib.dump(components, 'models/churn_model_components.pkl')
+# Function to fit a tuned model with a fixed seed, unless it was saved already fitted
+def fit_model(name, model, features, target, seed):
+    if is_fitted(model):
+        return model
+    if 'random_state' in model.get_params():
+        model.set_params(random_state=seed)
+    if name == 'svm':
+        model.set_params(probability=True)  # The app shows churn probabilities for every model
+    return model.fit(features, target)
+
+
+# Function to report the library versions the bundle was built with
+def library_versions():
+    import numpy
+    import sklearn
+    versions = {'joblib': joblib.__version__, 'numpy': numpy.__version__, 'pandas': pd.__version__, 'scikit-learn': sklearn.__version__}
+    try:
+        import xgboost
+        versions['xgboost'] = xgboost.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+# Build a versioned, checksummed model bundle from the tuned models and datasets/dn.csv
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the model bundle (preprocessor and tuned models) used by the app and the API.")
+    parser.add_argument('--models-dir', default=os.path.join(main_dir, 'models'), help="Directory holding the Churn_*_model.pkl files")
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH, help="Training data with a Churn column")
+    parser.add_argument('--preprocessor', default=None, help="Fitted preprocessor to use instead of fitting one")
+    parser.add_argument('--output', default=BUNDLES_DIR)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    raw = pd.read_csv(args.dataset)
+    features = dataset_to_expected(raw)
+    target = (raw['Churn'] == 'Yes').astype(int)
+
+    preprocessor = joblib.load(args.preprocessor) if args.preprocessor else build_preprocessor().fit(features)
+    transformed = preprocessor.transform(features)
+    models = {
+        name: fit_model(name, joblib.load(os.path.join(args.models_dir, file_name)), transformed, target, args.seed)
+        for name, file_name in MODEL_FILES.items()
+    }
+    components = {'preprocessing': {'preprocessor': preprocessor}, 'tuned_models': models}
+
+    metadata = {
+        'dataset': os.path.basename(args.dataset),
+        'dataset_sha256': file_sha256(args.dataset),
+        'training_rows': len(raw),
+        'seed': args.seed,
+        'libraries': library_versions(),
+    }
+    manifest, bundle_dir = write_bundle(components, args.output, features.head(5), metadata, mmap_mode=MMAP_MODE)
 
-print("churn_model_components.pkl has been created successfully!")
+    print(f"Bundle {manifest['version'][:12]} written to {bundle_dir}")
+    print(f"{'component':<22} {'bytes':>12} {'stored':>12} {'load_ms':>9} {'smoke_ms':>9}")
+    for entry in manifest['components']:
+        stored = 'compressed' if entry['compressed'] else 'mmap'
+        print(f"{entry['name']:<22} {entry['bytes']:>12,} {stored:>12} {entry['load_seconds'] * 1000:>9.2f} {entry['smoke_test_ms']:>9.3f}")
@@ -1,8 +1,16 @@
-import os
-import pandas as pd
+import time
+from utils.aggregates import get_aggregate_cube, HISTOGRAM_BIN_WIDTHS, DASHBOARD_SOURCE, DASHBOARD_SOURCES
+from utils.datasets import DEFAULT_DATASET_PATH
+from utils.figure_cache import figure_cache
+from utils.lazy_imports import lazy_module
+from utils import charts
 import streamlit as st
-import matplotlib.pyplot as plt
-import seaborn as sns
+import pandas as pd
+
+# matplotlib and seaborn are only imported when a chart is drawn on the server
+# (without Altair); the database modules only when a database source is selected
+plt = lazy_module('matplotlib.pyplot')
+sns = lazy_module('seaborn')
 
 # Set page configuration
 st.set_page_config(
@@ -11,11 +19,8 @@ st.set_page_config(
     layout="wide",
 )
 
-# Get the current working directory (where the script is running)
-current_dir = os.getcwd()
-
-# Define the relative path to 'datasets/dn.csv'
-dataset_path = os.path.join(current_dir, 'datasets', 'dn.csv')
+# Path to 'datasets/dn.csv' (the same path the server warm-up loads, so its cache is shared)
+dataset_path = DEFAULT_DATASET_PATH
 
 # Title and Introduction
 st.title("📊 Customer Churn Prediction Dashboard")
@@ -41,130 +46,245 @@ options = st.sidebar.radio("Go to", ["EDA Dashboard", "Analytics Dashboard"])
 if options == "EDA Dashboard":
     st.header("🔍 EDA Dashboard")
 
-    # Try to load the CSV file
+    # Choose where the data comes from: the CSV file, the local snapshot of the SQL table,
+    # or aggregation queries run by the database
+    sources = list(DASHBOARD_SOURCES)
+    data_source = st.sidebar.radio(
+        "Data source", sources, index=sources.index(DASHBOARD_SOURCE) if DASHBOARD_SOURCE in sources else 0,
+        format_func=DASHBOARD_SOURCES.get,
+    )
+
+    # With SQL aggregation the database runs the GROUP BY queries and only the aggregated
+    # rows are transferred (cached like the data page's queries); the CSV file is the fallback
+    cube = None
+    if data_source == 'sql':
+        try:
+            from utils.sql_aggregates import get_sql_aggregate_cube
+            cube, dataset_version, cache_statuses = get_sql_aggregate_cube()
+            st.sidebar.caption(f"SQL aggregates: {cache_statuses.count('hit') + cache_statuses.count('revalidated')} of {len(cache_statuses)} from the query cache.")
+        except Exception as e:
+            st.warning(f"SQL aggregation failed ({e}); showing the CSV file instead.")
+            data_source = 'csv'
+
+    # Try to load the aggregate cube (counts and sums computed once per dataset version)
     try:
-        dn = pd.read_csv(dataset_path)
+        if data_source == 'snapshot':
+            from utils.snapshot import get_snapshot_loader
+            cube, dataset_version = get_aggregate_cube(loader=get_snapshot_loader())
+        elif data_source == 'csv':
+            cube, dataset_version = get_aggregate_cube(dataset_path)
     except FileNotFoundError as e:
-        st.error(f"Error: {e}. Please ensure the file exists at the specified path: {dataset_path}")
-        dn = None  # Prevent the rest of the code from executing if the file isn't found
+        if data_source == 'snapshot':
+            st.error(f"Error: {e}. Run `python -m utils.snapshot` (or Sync on the Data page) to create the snapshot.")
+        else:
+            st.error(f"Error: {e}. Please ensure the file exists at the specified path: {dataset_path}")
+        cube = None  # Prevent the rest of the code from executing if the file isn't found
     
-    # If the file is successfully loaded, continue with visualizations
-    if dn is not None:
-        # Visualization: Types of Contracts
-        if 'Contract' in dn.columns:
-            st.markdown("### Types of Contracts")
-            value_counts = dn['Contract'].value_counts()
+    # Function to show a chart with the deployment's chart backend
+    # With Altair the browser draws spec() from the aggregated data; otherwise the image
+    # comes from the figure cache and draw() only runs when it is not cached yet.
+    def show_chart(chart_id, draw, spec=None, **params):
+        if spec is not None and charts.chart_backend() == "altair":
+            st.altair_chart(spec(), use_container_width=True)
+        else:
+            image = figure_cache.get_or_render(dataset_version, chart_id, draw, params)
+            st.image(image, use_container_width=True)
+
+    # Function to run one dashboard section as a fragment
+    # The section's data work and drawing only happen while its toggle is on, and switching
+    # it or changing the section's own inputs reruns just this section, not the whole page.
+    @st.fragment
+    def dashboard_section(section_id, title, render, expanded=False):
+        with st.container(border=True):
+            if not st.toggle(f"**{title}**", value=expanded, key=f"section_{section_id}"):
+                return
+            start = time.perf_counter()
+            render()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            st.session_state.setdefault('section_timings', {})[title] = elapsed_ms
+            st.caption(f"Section rendered in {elapsed_ms:.1f} ms")
+
+    # Visualization: Types of Contracts
+    def contracts_section():
+        if not cube.has('Contract'):
+            st.info("No 'Contract' column in the dataset.")
+            return
+
+        def draw_contracts():
             fig, ax = plt.subplots(figsize=(6, 4))
-            value_counts.plot(kind='barh', color='skyblue', ax=ax)
+            cube.counts('Contract').plot(kind='barh', color='skyblue', ax=ax)
             ax.set_title('Types of Contracts')
-            st.pyplot(fig)
-            plt.close(fig)  # Close the figure
+            return fig
+
+        show_chart('contracts', draw_contracts, lambda: charts.count_bar_spec(cube.counts('Contract'), 'Contract', 'Types of Contracts', 'skyblue', horizontal=True))
+
+    # Create histogram plot of Monthly Charges using seaborn
+    def monthly_charges_section():
+        if not cube.has('Monthly_Charges_hist'):
+            st.info("No 'Monthly_Charges' column in the dataset.")
+            return
 
-        # Create histogram plot of Monthly Charges using seaborn
-        if 'Monthly_Charges' in dn.columns:
-            st.markdown("### Distribution of Monthly Charges")
+        def draw_monthly_charges():
+            histogram, bin_range = cube.histogram('Monthly_Charges')
             fig, ax = plt.subplots(figsize=(6, 4))
-            sns.histplot(data=dn['Monthly_Charges'], kde=True, ax=ax)
+            sns.histplot(data=histogram, x='Monthly_Charges', weights='count', binwidth=HISTOGRAM_BIN_WIDTHS['Monthly_Charges'], binrange=bin_range, kde=True, ax=ax)
             ax.set_title('Distribution of Monthly Charges')
-            st.pyplot(fig)
-            plt.close(fig)  # Close the figure
-        else:
-            st.info("No 'Monthly_Charges' column in the dataset.")
+            return fig
 
-        # Create histogram plot of Total Charges using seaborn
-        if 'Total_Charges' in dn.columns:
-            st.markdown("### Distribution of Total Charges")
+        show_chart('monthly_charges', draw_monthly_charges, lambda: charts.histogram_spec(cube.histogram('Monthly_Charges')[0], 'Monthly_Charges', HISTOGRAM_BIN_WIDTHS['Monthly_Charges'], 'Distribution of Monthly Charges'))
+
+    # Create histogram plot of Total Charges using seaborn
+    def total_charges_section():
+        if not cube.has('Total_Charges_hist'):
+            st.info("No 'Total_Charges' column in the dataset.")
+            return
+
+        def draw_total_charges():
+            histogram, bin_range = cube.histogram('Total_Charges')
             fig, ax = plt.subplots(figsize=(6, 4))
-            sns.histplot(data=dn['Total_Charges'], kde=True, ax=ax)
+            sns.histplot(data=histogram, x='Total_Charges', weights='count', binwidth=HISTOGRAM_BIN_WIDTHS['Total_Charges'], binrange=bin_range, kde=True, ax=ax)
             ax.set_title('Distribution of Total Charges')
-            st.pyplot(fig)
-            plt.close(fig)  # Close the figure
-        else:
-            st.info("No 'Total_Charges' column in the dataset.")
+            return fig
 
-        # Count and create pie chart of the 'SeniorCitizen' column
-        if 'Senior_Citizen' in dn.columns:
-            st.markdown("### Distribution of Senior Citizens")
-            senior_citizen_counts = dn['Senior_Citizen'].value_counts()
-            labels = ['Non-Senior Citizen', 'Senior Citizen']
-            counts = [senior_citizen_counts.get(0, 0), senior_citizen_counts.get(1, 0)]
-            colors = ['#009ACD', '#ADD8E6']
+        show_chart('total_charges', draw_total_charges, lambda: charts.histogram_spec(cube.histogram('Total_Charges')[0], 'Total_Charges', HISTOGRAM_BIN_WIDTHS['Total_Charges'], 'Distribution of Total Charges'))
+
+    # Count and create pie chart of the 'SeniorCitizen' column
+    def senior_citizens_section():
+        if not cube.has('Senior_Citizen'):
+            st.info("No 'Senior_Citizen' column in the dataset.")
+            return
+
+        labels = ['Non-Senior Citizen', 'Senior Citizen']
+        colors = ['#009ACD', '#ADD8E6']
+
+        def senior_citizen_counts():
+            counts = cube.counts('Senior_Citizen')
+            return [int(counts.get(False, 0)), int(counts.get(True, 0))]
+
+        def draw_senior_citizens():
             fig, ax = plt.subplots(figsize=(6, 4))
-            ax.pie(counts, labels=labels, colors=colors, autopct='%1.0f%%', shadow=False)
+            ax.pie(senior_citizen_counts(), labels=labels, colors=colors, autopct='%1.0f%%', shadow=False)
             ax.axis('equal')
             ax.set_title('Distribution of Senior Citizens')
-            st.pyplot(fig)
-            plt.close(fig)  # Close the figure
-        else:
-            st.info("No 'Senior_Citizen' column in the dataset.")
+            return fig
 
-        # Visualization: Gender Distribution
-        if 'Gender' in dn.columns:
-            st.markdown("### Distribution of Gender")
-            value_counts = dn['Gender'].value_counts()
+        show_chart('senior_citizens', draw_senior_citizens, lambda: charts.pie_spec(labels, senior_citizen_counts(), colors, 'Distribution of Senior Citizens'))
+
+    # Visualization: Gender Distribution
+    def gender_section():
+        if not cube.has('Gender'):
+            st.info("No 'Gender' column in the dataset.")
+            return
+
+        def draw_gender():
             fig, ax = plt.subplots(figsize=(6, 4))
-            value_counts.plot(kind='bar', color='red', ax=ax)
+            cube.counts('Gender').plot(kind='bar', color='red', ax=ax)
             ax.set_title('Distribution of Gender')
-            st.pyplot(fig)
-            plt.close(fig)  # Close the figure
-        else:
-            st.info("No 'Gender' column in the dataset.")
+            return fig
+
+        show_chart('gender', draw_gender, lambda: charts.count_bar_spec(cube.counts('Gender'), 'Gender', 'Distribution of Gender', 'red'))
+
+    # Calculate churn rates by payment method
+    def churn_by_payment_section():
+        if not cube.has('payment_churn'):
+            st.info("No 'Churn' or 'Payment_Method' column in the dataset.")
+            return
 
-        # Calculate churn rates by payment method
-        if 'Churn' in dn.columns and 'Payment_Method' in dn.columns:
-            st.markdown("### Churn Rate by Payment Method")
-            churn_counts = dn.groupby('Payment_Method')['Churn'].value_counts(normalize=True).unstack()
+        def draw_churn_by_payment():
+            churn_counts = cube.churn_rate_by_payment()
             fig, ax = plt.subplots(figsize=(10, 6))
             churn_counts.plot(kind='bar', stacked=True, color=['green', 'red'], ax=ax)
             ax.set_title('Churn Rate by Payment Method')
             ax.set_xlabel('Payment Method')
             ax.set_ylabel('Churn Rate')
             ax.legend(title='Churn')
-            st.pyplot(fig)
-            plt.close(fig)  # Close the figure
-        else:
-            st.info("No 'Churn' or 'Payment_Method' column in the dataset.")
+            return fig
 
-        # Multivariate analysis of Partner, Tenure, Monthly Charges, and Churn
-        if all(col in dn.columns for col in ['Partner', 'Churn', 'Tenure_Months', 'Monthly_Charges']):
-            st.markdown("### Multivariate Analysis: Partner, Tenure, Monthly Charges and Churn")
-            multivariate_df = dn.groupby(['Partner', 'Churn']).agg({'Tenure_Months': 'mean', 'Monthly_Charges': 'mean'}).reset_index()
-            fig, ax = plt.subplots(figsize=(12, 8))
+        show_chart('churn_by_payment', draw_churn_by_payment, lambda: charts.churn_rate_spec(cube.churn_rate_by_payment(), 'Churn Rate by Payment Method'))
+
+    # Multivariate analysis of Partner, Tenure, Monthly Charges, and Churn
+    def partner_churn_section():
+        if not cube.has('partner_churn'):
+            st.info("One or more columns for multivariate analysis are missing.")
+            return
+
+        def draw_partner_churn():
+            multivariate_df = cube.partner_churn_means()
+            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
 
             # Tenure vs Churn
-            plt.subplot(2, 1, 1)
-            sns.barplot(data=multivariate_df, x='Partner', y='Tenure_Months', hue='Churn', palette='pastel')
-            plt.title('Tenure vs Churn by Partner Status')
-            plt.xlabel('Partner Status')
-            plt.ylabel('Average Tenure')
+            sns.barplot(data=multivariate_df, x='Partner', y='Tenure_Months', hue='Churn', palette='pastel', ax=ax1)
+            ax1.set_title('Tenure vs Churn by Partner Status')
+            ax1.set_xlabel('Partner Status')
+            ax1.set_ylabel('Average Tenure')
 
             # Monthly Charges vs Churn
-            plt.subplot(2, 1, 2)
-            sns.barplot(data=multivariate_df, x='Partner', y='Monthly_Charges', hue='Churn', palette='pastel')
-            plt.title('Monthly Charges vs Churn by Partner Status')
-            plt.xlabel('Partner Status')
-            plt.ylabel('Average Monthly Charges')
-
-            plt.tight_layout()
-            st.pyplot(fig)
-            plt.close(fig)  
-        else:
-            st.info("One or more columns for multivariate analysis are missing.")
+            sns.barplot(data=multivariate_df, x='Partner', y='Monthly_Charges', hue='Churn', palette='pastel', ax=ax2)
+            ax2.set_title('Monthly Charges vs Churn by Partner Status')
+            ax2.set_xlabel('Partner Status')
+            ax2.set_ylabel('Average Monthly Charges')
+
+            fig.tight_layout()
+            return fig
+
+        def partner_churn_spec():
+            multivariate_df = cube.partner_churn_means()
+            return charts.partner_churn_spec(multivariate_df, 'Tenure_Months', 'Tenure vs Churn by Partner Status', 'Average Tenure') & \
+                charts.partner_churn_spec(multivariate_df, 'Monthly_Charges', 'Monthly Charges vs Churn by Partner Status', 'Average Monthly Charges')
+
+        show_chart('partner_churn', draw_partner_churn, partner_churn_spec)
+
+    # Grouping by tenure and calculating the mean Total Charges
+    def tenure_total_section():
+        if not cube.has('tenure_total'):
+            st.info("No 'Tenure_Months' or 'Total_Charges' column in the dataset.")
+            return
+
+        tenure_means = cube.tenure_total_means()
+        top_n = min(15, len(tenure_means))
+        if len(tenure_means) > 1:
+            top_n = st.slider("Tenure values to show", min_value=1, max_value=len(tenure_means), value=top_n, key='tenure_top_n')
 
-        # Grouping by tenure and calculating the mean Total Charges
-        if 'Tenure_Months' in dn.columns and 'Total_Charges' in dn.columns:
-            st.markdown("### Mean Total Charges by Tenure")
-            df_grp_tenure = dn.groupby('Tenure_Months')['Total_Charges'].mean().reset_index()
-            df_grp_tenure_15 = df_grp_tenure.head(15)
+        def draw_tenure_total():
+            df_grp_tenure = tenure_means.head(top_n)
             fig, ax = plt.subplots(figsize=(12, 6))
-            sns.pointplot(data=df_grp_tenure_15, x='Tenure_Months', y='Total_Charges', color='steelblue', ax=ax)
+            sns.pointplot(data=df_grp_tenure, x='Tenure_Months', y='Total_Charges', color='steelblue', ax=ax)
             ax.set_title('Mean Total Charges by Tenure')
             ax.set_xlabel('Tenure')
             ax.set_ylabel('Mean Total Charges')
-            st.pyplot(fig)
-            plt.close(fig)  # Close the figure
-        else:
-            st.info("No 'Tenure_Months' or 'Total_Charges' column in the dataset.")
+            return fig
+
+        show_chart('tenure_total', draw_tenure_total, lambda: charts.tenure_total_spec(tenure_means.head(top_n), 'Mean Total Charges by Tenure'), top_n=top_n)
+
+    # If the file is successfully loaded, continue with visualizations
+    if cube is not None:
+        st.caption(f"Charts computed from {cube.row_count:,} rows (dataset version {dataset_version[:12]}). Switch a section on to load it.")
+
+        dashboard_section('contracts', "Types of Contracts", contracts_section, expanded=True)
+        dashboard_section('monthly_charges', "Distribution of Monthly Charges", monthly_charges_section)
+        dashboard_section('total_charges', "Distribution of Total Charges", total_charges_section)
+        dashboard_section('senior_citizens', "Distribution of Senior Citizens", senior_citizens_section)
+        dashboard_section('gender', "Distribution of Gender", gender_section)
+        dashboard_section('churn_by_payment', "Churn Rate by Payment Method", churn_by_payment_section)
+        dashboard_section('partner_churn', "Multivariate Analysis: Partner, Tenure, Monthly Charges and Churn", partner_churn_section)
+        dashboard_section('tenure_total', "Mean Total Charges by Tenure", tenure_total_section)
+
+        # Report the chart backend, the figure cache and the last timing of every opened section
+        cache_stats = figure_cache.stats()
+        st.sidebar.caption(
+            f"Chart backend: {charts.chart_backend()}. "
+            f"Figure cache: {cache_stats['hits']} hits, {cache_stats['misses']} renders, "
+            f"{cache_stats['megabytes']:.1f} MB, {cache_stats['render_seconds_saved']:.1f} s of rendering saved."
+        )
+        section_timings = st.session_state.get('section_timings')
+        if section_timings:
+            with st.sidebar.expander("Section timings"):
+                # Formatted with column_config rather than a Styler, which would import matplotlib
+                st.dataframe(
+                    pd.DataFrame({'Section': list(section_timings), 'ms': list(section_timings.values())}),
+                    hide_index=True,
+                    column_config={'ms': st.column_config.NumberColumn(format='%.1f')},
+                )
 
 
 # Analytics Dashboard
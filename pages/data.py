@@ -1,9 +1,11 @@
 import streamlit as st
-import pandas as pd
-from urllib.parse import quote_plus
-import os
-import pyodbc
-from dotenv import dotenv_values, load_dotenv
+from contextlib import closing
+from datetime import datetime
+from utils.database import get_engine, pool_status
+from utils.data_browser import KEY_COLUMN, FILTER_COLUMNS, SORT_COLUMNS, PAGE_SIZES, DEFAULT_STREAM_CHUNK_SIZE, get_data_browser
+from utils.data_stream import STREAM_MEMORY_CAP_MB, ChunkCollector
+from utils.query_cache import get_query_cache
+from utils.snapshot import SnapshotSync, read_manifest
 
 # Set up page title
 st.set_page_config(
@@ -16,50 +18,160 @@ st.set_page_config(
 st.title("👁️ Welcome to the Data Page")
 st.write("Here you can view the data fetched from your database.")
 
-# Load environment variables from .env file
-# env_vars = dotenv_values('.env')
-
-# Initialize the connection variable
-conn = None
-# env_vars = {'SERVER': 'dap-projects-database.database.windows.net', 'USER': 'LP2_project', 'PASSWORD': 'Stat$AndD@t@Rul3', 'DATABASE': 'dapDB'}
 try:
-    # Establish database connection using credentials from .env file
-    load_dotenv()
+    # Get the shared engine; connections come from its pool instead of a new connect per rerun
+    # (settings are read from pages/.env, see utils/database.py)
+    engine = get_engine()
+    browser = get_data_browser(engine)
+    st.success("Successfully connected to the database!")
 
-    # Getting environment variables
-    server = os.getenv("SERVER")
-    database = os.getenv("DATABASE")
-    username = os.getenv("USER")
-    password = os.getenv("PASSWORD")
+    # Choose the columns, filters, ordering and page size; all of them are applied in SQL
+    columns = st.multiselect("Columns", browser.columns, default=browser.columns)
+    filters = {}
+    for col, filter_col in zip(st.columns(len(FILTER_COLUMNS)), FILTER_COLUMNS):
+        if filter_col in browser.columns:
+            filters[filter_col] = col.multiselect(filter_col, browser.distinct_values(filter_col))
+    col1, col2, col3 = st.columns(3)
+    sort_column = col1.selectbox("Sort by", [col for col in SORT_COLUMNS if col in browser.columns])
+    descending = col2.checkbox("Descending")
+    fetch_mode = col3.radio("Fetch", ["One page at a time", "Stream all rows"], horizontal=True)
 
-    # URL-encode password to handle special characters
-    encoded_password = quote_plus(password)
+    if fetch_mode == "One page at a time":
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1)
 
-    # SQLAlchemy connection string
-    # connection_string = f"mssql+pyodbc://{username}:{encoded_password}@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server"
+        # Start again from the first page whenever the query changes
+        # data_cursors holds the keyset cursor each visited page starts after (None for the first page)
+        query_signature = (tuple(columns), tuple((k, tuple(v)) for k, v in filters.items()), sort_column, descending, page_size)
+        if st.session_state.get('data_query') != query_signature:
+            st.session_state.data_query = query_signature
+            st.session_state.data_cursors = [None]
+            st.session_state.data_next_cursor = None
 
-    # server = env_vars.get('SERVER')
-    # database = env_vars.get('DATABASE')
-    # username = env_vars.get('USER')
-    # password = env_vars.get('PASSWORD')
-   
-    connection_string = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password};MARS_Connection=yes;MinProtocolVersion=TLSv1.2;"
+        # Function to move to the next, previous or first page
+        def next_page():
+            st.session_state.data_cursors.append(st.session_state.data_next_cursor)
 
-    conn = pyodbc.connect(connection_string)
-    st.success("Successfully connected to the database!")
+        def previous_page():
+            st.session_state.data_cursors.pop()
+
+        def first_page():
+            st.session_state.data_cursors = [None]
+
+        # Fetch only the page being shown
+        df, next_cursor, query_ms, cache_status = browser.fetch_page(
+            columns, filters, sort_column, descending, page_size, after=st.session_state.data_cursors[-1]
+        )
+        st.session_state.data_next_cursor = next_cursor
+        page_number = len(st.session_state.data_cursors)
 
-    # SQL query to fetch data
-    query = "SELECT * FROM dbo.LP2_Telco_churn_first_3000"
-    df = pd.read_sql(query, conn)
+        # Display the data in a nice table
+        st.dataframe(df, hide_index=True)
+        st.caption(
+            f"Page {page_number}: {len(df)} rows in {query_ms:.1f} ms ({cache_status or 'not cached'}), "
+            f"ordered by {sort_column}{'' if sort_column == KEY_COLUMN else ' then ' + KEY_COLUMN}."
+        )
 
-    # Display the data in a nice table
-    st.write(df)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.button("First", on_click=first_page, disabled=page_number == 1)
+        col2.button("Previous", on_click=previous_page, disabled=page_number == 1)
+        col3.button("Next", on_click=next_page, disabled=next_cursor is None)
+        if col4.button("Count matching rows"):
+            col4.write(f"{browser.count(filters):,} rows")
+
+    else:
+        # Stream every matching row in chunks; each chunk is added to the table as it arrives
+        col1, col2, col3 = st.columns(3)
+        chunk_size = col1.number_input("Rows per chunk", min_value=100, max_value=100_000, value=DEFAULT_STREAM_CHUNK_SIZE, step=1_000)
+        memory_cap_mb = col2.number_input("Memory cap (MB)", min_value=1, max_value=8_192, value=STREAM_MEMORY_CAP_MB)
+        on_cap = col3.radio("When the cap is reached", ["Stop", "Spill to disk"], horizontal=True)
+        stream_signature = (tuple(columns), tuple((k, tuple(v)) for k, v in filters.items()), sort_column, descending)
+
+        if st.button("Start streaming"):
+            total_rows = browser.count(filters)
+            # Any click while streaming (like Cancel) interrupts this run; the rows read so far
+            # stay in session state and are shown on the next run
+            st.button("Cancel")
+            progress = st.progress(0.0, text="Starting...")
+            collector = ChunkCollector(memory_cap_mb * 1024 * 1024, spill=on_cap == "Spill to disk")
+            st.session_state.data_stream = (stream_signature, collector)
+            table_element = None
+            try:
+                with closing(browser.stream(columns, filters, sort_column, descending, chunk_size)) as chunks:
+                    for chunk in chunks:
+                        placement = collector.add(chunk)
+                        if placement == 'stopped':
+                            break
+                        if placement == 'memory':
+                            if table_element is None:
+                                table_element = st.dataframe(chunk, hide_index=True)
+                            else:
+                                table_element.add_rows(chunk)
+                        progress.progress(
+                            min(1.0, collector.rows / max(total_rows, 1)),
+                            text=f"{collector.rows:,} of {total_rows:,} rows ({collector.memory_bytes / (1024 * 1024):.1f} MB in memory)",
+                        )
+                    else:
+                        collector.finished = True
+            finally:
+                collector.close()
+            progress.empty()
+        else:
+            # Show the rows of the last stream of this query (complete, stopped or cancelled)
+            stream = st.session_state.get('data_stream')
+            if stream is not None and stream[0] == stream_signature:
+                collector = stream[1]
+                table = collector.table()
+                if table is not None:
+                    st.dataframe(table, hide_index=True)
+                if not collector.finished and not collector.stopped:
+                    st.warning(f"Streaming was cancelled after {collector.rows:,} rows.")
+
+        stream = st.session_state.get('data_stream')
+        if stream is not None and stream[0] == stream_signature:
+            collector = stream[1]
+            if collector.stopped:
+                st.warning(f"Stopped at the {memory_cap_mb} MB memory cap after {collector.rows:,} rows.")
+            if collector.spill_path:
+                st.info(f"{collector.rows_spilled:,} rows past the memory cap were written to {collector.spill_path}.")
+            if collector.finished:
+                st.caption(f"Streamed all {collector.rows:,} rows; {collector.rows_in_memory:,} are shown.")
 
 except Exception as e:
     st.error(f"Error: {e.__str__()}")
 
-finally:
-    # Close the connection if it was successfully opened
-    if conn:
-        conn.close()
-        st.info("Database connection closed.")
+else:
+    # Show how the connection pool is being used by all sessions of this server
+    with st.sidebar.expander("Connection Pool"):
+        status = pool_status(engine)
+        st.write(f"Connections opened: {status['connections_opened']}")
+        st.write(f"Queries served (checkouts): {status['checkouts']}")
+        if 'size' in status:
+            st.write(f"Pool size: {status['size']}, in use: {status['checkedout']}, idle: {status['checkedin']}, overflow: {max(0, status['overflow'])}")
+
+    # Show how often page and count queries were answered from the local result cache
+    with st.sidebar.expander("Query Cache"):
+        cache_stats = get_query_cache().stats()
+        st.write(f"Hit rate: {cache_stats['hit_rate']:.0%} of {cache_stats['requests']} queries")
+        for status, label in [('hit', 'Hits'), ('revalidated', 'Revalidated by probe'), ('miss', 'Misses (queried the database)')]:
+            latency = cache_stats[f'{status}_ms']
+            st.write(f"{label}: {cache_stats[status]}" + (f", {latency:.1f} ms on average" if latency is not None else ""))
+        st.write(f"Table probes: {cache_stats['probes']}")
+
+    # Keep the local Parquet snapshot used by the dashboard and bulk scoring in step with the table
+    with st.sidebar.expander("Local Snapshot"):
+        if st.button("Sync now"):
+            try:
+                summary = SnapshotSync(engine).sync()
+            except Exception as e:
+                st.error(f"Snapshot sync failed: {e}")
+            else:
+                st.write(
+                    f"{summary['changed']:,} new or changed and {summary['deleted']:,} deleted rows, "
+                    f"{summary['partitions_written']} partitions written in {summary['seconds']:.2f} s."
+                )
+        manifest = read_manifest()
+        if manifest is None:
+            st.write("No snapshot yet.")
+        else:
+            synced_at = datetime.fromtimestamp(manifest['synced_at']).strftime('%Y-%m-%d %H:%M:%S')
+            st.write(f"Version {manifest['version']}: {manifest['rows']:,} rows in {len(manifest['partitions'])} partitions, synced {synced_at}.")
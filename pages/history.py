@@ -1,5 +1,8 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
+from datetime import datetime, time
+from utils.history_store import HistoryStore
+from utils.history_export import select_rows, export_csv, export_parquet
 
 # Set page configuration
 st.set_page_config(
@@ -12,19 +15,67 @@ st.set_page_config(
 st.header("Prediction History")
 
 # Check if history exists in session state
-if 'history' in st.session_state and not st.session_state.history.empty:
-    # Display the prediction history as a table
-    st.dataframe(st.session_state.history)
+history = st.session_state.get('history')
+if isinstance(history, HistoryStore) and not history.empty:
+    # Optionally narrow the history to a date/time range
+    if st.checkbox("Filter by date and time"):
+        dates = history.column('Date')
+        first_day = datetime.strptime(str(dates[0]), '%Y-%m-%d').date()
+        last_day = datetime.strptime(str(dates[-1]), '%Y-%m-%d').date()
+        col1, col2, col3, col4 = st.columns(4)
+        start_day = col1.date_input("From date", first_day)
+        start_time = col2.time_input("From time", time(0, 0))
+        end_day = col3.date_input("To date", last_day)
+        end_time = col4.time_input("To time", time(23, 59, 59))
+        rows = select_rows(history, datetime.combine(start_day, start_time), datetime.combine(end_day, end_time))
+    else:
+        rows = np.arange(len(history))
 
-    # Option to download the history as a CSV file
-    csv = st.session_state.history.to_csv(index=False)
-    st.download_button(
-        label="Download Prediction History as CSV",
-        data=csv,
-        file_name="prediction_history.csv",
-        mime="text/csv",
-    )
+    st.write(f"{len(rows):,} of {len(history):,} predictions in this session.")
+
+    if len(rows) > 0:
+        # Display one page of the prediction history as a table
+        col1, col2 = st.columns(2)
+        page_size = col1.selectbox("Rows per page", [25, 50, 100, 500], index=1)
+        page_count = max(1, -(-len(rows) // page_size))
+        page_number = col2.number_input(f"Page (1-{page_count})", min_value=1, max_value=page_count, value=page_count)
+        page_rows = rows[(page_number - 1) * page_size:page_number * page_size]
+        st.dataframe(history.take(page_rows))
+
+        # Option to download the history; only the chosen rows are serialized, chunk by chunk
+        st.markdown("#### Download")
+        col1, col2 = st.columns(2)
+        scope = col1.radio("Rows to download", ["Current page", "All selected rows"], horizontal=True)
+        file_format = col2.radio("Format", ["CSV", "Parquet"], horizontal=True)
+        if st.button("Prepare Download"):
+            export_rows = page_rows if scope == "Current page" else rows
+            if 'history_export' in st.session_state:
+                st.session_state.history_export[0].remove()  # Only the latest export is kept on disk
+            if file_format == "CSV":
+                parts, mime = export_csv(history, export_rows, "prediction_history.csv"), "text/csv"
+            else:
+                parts, mime = export_parquet(history, export_rows, "prediction_history.parquet"), "application/octet-stream"
+            st.session_state.history_export = (parts, file_format, mime)
+
+        # st.download_button holds its file in memory, so large exports come in parts of
+        # about DOWNLOAD_MAX_BYTES and only the chosen part is read
+        if 'history_export' in st.session_state:
+            parts, export_format, mime = st.session_state.history_export
+            if not parts.available():
+                del st.session_state.history_export
+                st.info("The prepared download has expired. Prepare it again.")
+            else:
+                part = 0
+                if len(parts.paths) > 1:
+                    st.info(f"The export is {parts.size() / 1024 / 1024:,.0f} MB, so it is split into {len(parts.paths)} files of about {parts.max_bytes / 1024 / 1024:,.0f} MB that can each be opened on their own.")
+                    names = [parts.file_name(i) for i in range(len(parts.paths))]
+                    part = names.index(st.selectbox("Part", names))
+                st.download_button(
+                    label=f"Download Prediction History as {export_format}",
+                    data=parts.read(part),
+                    file_name=parts.file_name(part),
+                    mime=mime,
+                )
 else:
     # If there is no history available
     st.write("No predictions have been made yet.")
-
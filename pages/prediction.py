@@ -1,15 +1,17 @@
 import streamlit as st
-import numpy as np
-import joblib
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
-import os
+from utils.model_registry import get_registry
+from utils.batching import get_prediction_batcher
+from utils.fast_encoder import get_fast_encoder
+from utils.tree_engine import get_tree_models
+from utils.history_store import HistoryStore
+from utils import charts
+from utils.prediction_cache import prediction_cache
+from utils.scoring_client import use_remote_scoring, predict_remote
+from utils.scoring import expected_columns, dataset_to_expected, predict_record, compare_models, read_customer_file, bulk_predict, per_row_rows_per_second
+from utils.lazy_imports import lazy_module
 
-# Dynamically set the path to the "churn_model_components.pkl" file
-script_dir = os.path.dirname(os.path.abspath(__file__))  # Get the directory of this script (pages folder)
-main_dir = os.path.dirname(script_dir)  # Navigate up to the main folder (churn_prediction_app)
-file_path = os.path.join(main_dir, "models", "churn_model_components.pkl")  # Path to the model file
+plt = lazy_module('matplotlib.pyplot')  # Only for charts drawn without Altair
 
 # Set page configuration
 st.set_page_config(
@@ -23,134 +25,300 @@ page_title = "🔮 Predictive Analytics Dashboard"
 st.title(page_title)
 st.subheader("Empowering your decisions with data-driven insights")
 
-# Load the model and preprocessing tools
+# Load the model and preprocessing tools (shared by every session in this server process)
+# MODEL_BUNDLE_PATH, else the current build in models/bundles, else models/churn_model_components.pkl
+registry = get_registry()
+file_path = registry.path
 try:
-    components = joblib.load(file_path)  # Load the model components
+    components = registry.get()  # Loaded once and reloaded only when the file content changes
     st.success("Model components loaded successfully!")
 except FileNotFoundError:
-    st.error(f"Model file not found at: {file_path}. Please ensure the file is in the 'models' folder.")
+    st.error(f"Model file not found at: {file_path}. Build one with `python -m models.create_model_components`.")
     st.stop()
 
-# Extract the preprocessor and models
+# Show how often the shared bundle has been loaded in this server process
+registry_stats = registry.stats()
+with st.sidebar.expander("Model Registry"):
+    st.write(f"Bundle version: {registry_stats['version']}")
+    st.write(f"Loads in this process: {registry_stats['load_count']}")
+    if registry_stats['last_load_seconds'] is not None:
+        st.write(f"Last load time: {registry_stats['last_load_seconds']:.2f} s")
+    if registry_stats['resident_memory_mb'] is not None:
+        st.write(f"Resident memory: {registry_stats['resident_memory_mb']:.0f} MB")
+
+# Compiled feature encoder, verified against the preprocessor on datasets/dn.csv
+encoder, encoder_status = get_fast_encoder(registry)
+with st.sidebar.expander("Feature Encoder"):
+    st.write(encoder_status)
+
+# random_forest and xgboost compiled to flat node arrays, verified against the originals
+tree_models, tree_engine_statuses = get_tree_models(registry)
+if tree_engine_statuses:
+    with st.sidebar.expander("Tree Engine"):
+        for model_name, status in tree_engine_statuses.items():
+            st.write(f"{model_name}: {status}")
+
+# Show how often predictions are answered from the cache
+cache_stats = prediction_cache.stats()
+with st.sidebar.expander("Prediction Cache"):
+    st.write(f"Hits: {cache_stats['hits']} / Misses: {cache_stats['misses']} ({cache_stats['hit_rate']:.0%} hit rate)")
+    st.write(f"Cached profiles: {cache_stats['entries']}")
+
+# Concurrent predictions from all sessions are coalesced into vectorized calls
+batcher = get_prediction_batcher(registry)
+if batcher is not None:
+    batch_metrics = batcher.metrics()
+    with st.sidebar.expander("Micro-batching"):
+        st.write(f"Requests: {batch_metrics['requests']} in {batch_metrics['batches']} batches")
+        st.write(f"Mean batch size: {batch_metrics['mean_batch_size']:.2f} (max {batch_metrics['max_batch_size']})")
+        st.write(f"Queueing delay p50/p99: {batch_metrics['queue_delay_p50_ms']:.1f} / {batch_metrics['queue_delay_p99_ms']:.1f} ms")
+
+# Extract the preprocessor and models (compiled tree ensembles when enabled and verified)
 preprocessor = components['preprocessing']['preprocessor']
-models = components['tuned_models']
-
-# Define the expected columns and their default values
-expected_columns = {
-    'Gender': 'Male', 'Senior_Citizen': 'No', 'Partner': 'No', 'Dependents': 'No', 
-    'tenure': 0, 'Phone_Service': 'No', 'Multiple_Lines': 'No phone service', 
-    'Internet_Service': 'DSL', 'Online_Security': 'No internet service', 
-    'Online_Backup': 'No internet service', 'Device_Protection': 'No internet service', 
-    'Tech_Support': 'No internet service', 'Streaming_TV': 'No internet service', 
-    'Streaming_Movies': 'No internet service', 'Contract': 'Month-to-month', 
-    'Paperless_Billing': 'No', 'Payment_Method': 'Electronic check', 
-    'Monthly_Charges': 0.0, 'Total_Charges': 0.0
-}
+models = tree_models
+
+# Function to score a customer without the cache
+def score_uncached(attributes, model_name):
+    # Use the scoring service when SCORING_API_URL is set, otherwise score in-process
+    if use_remote_scoring():
+        return predict_remote(attributes, model_name)
+    if batcher is not None:
+        return batcher.predict(attributes, model_name)
+    # predict_record combines user attributes with the default values
+    return predict_record(attributes, preprocessor, models[model_name], encoder)
 
 # Function to make predictions
+# Repeated profiles are answered from the process-wide cache, skipping the transform and
+# inference; the cache is cleared whenever the model bundle version changes.
 def predict(attributes, model_name='random_forest'):
-    # Combine user attributes with the default values
-    user_data = {**expected_columns, **attributes}
-    df = pd.DataFrame([user_data], columns=expected_columns.keys())
-    processed_df = preprocessor.transform(df)
-    pred = models[model_name].predict(processed_df)
-    prob = models[model_name].predict_proba(processed_df)
-    return pred[0], np.max(prob)
+    return prediction_cache.get_or_compute(
+        attributes, model_name, registry.version, lambda: score_uncached(attributes, model_name)
+    )
 
 # Initialize session state to store history if it doesn't exist
-if 'history' not in st.session_state:
-    st.session_state.history = pd.DataFrame(columns=['Date', 'Time', 'Prediction', 'Probability'])
-
-# Check if the page is for predictions
-st.markdown("### Enter Customer Details to Predict Churn")
-
-# Create a form for user input
-with st.form(key='user_input_form'):
-    gender = st.selectbox('Gender', ['Male', 'Female'])
-    senior_citizen = st.selectbox('Senior Citizen', ['Yes', 'No'])
-    partner = st.selectbox('Partner', ['Yes', 'No'])
-    dependents = st.selectbox('Dependents', ['Yes', 'No'])
-    tenure = st.slider('Tenure (in months)', 0, 100, 1)
-    phone_service = st.selectbox('Phone Service', ['Yes', 'No'])
-    multiple_lines = st.selectbox('Multiple Lines', ['Yes', 'No', 'No phone service'])
-    internet_service = st.selectbox('Internet Service', ['DSL', 'Fiber optic', 'No'])
-    online_security = st.selectbox('Online Security', ['Yes', 'No', 'No internet service'])
-    online_backup = st.selectbox('Online Backup', ['Yes', 'No', 'No internet service'])
-    device_protection = st.selectbox('Device Protection', ['Yes', 'No', 'No internet service'])
-    tech_support = st.selectbox('Tech Support', ['Yes', 'No', 'No internet service'])
-    streaming_tv = st.selectbox('Streaming TV', ['Yes', 'No', 'No internet service'])
-    streaming_movies = st.selectbox('Streaming Movies', ['Yes', 'No', 'No internet service'])
-    contract = st.selectbox('Contract', ['Month-to-month', 'One year', 'Two year'])
-    paperless_billing = st.selectbox('Paperless Billing', ['Yes', 'No'])
-    payment_method = st.selectbox('Payment Method', ['Electronic check', 'Mailed check', 'Bank transfer (automatic)', 'Credit card (automatic)'])
-    monthly_charges = st.number_input('Monthly Charges', 0.0, 200.0, 70.0)
-    total_charges = st.number_input('Total Charges', 0.0, 10000.0, 150.0)
-
-    # Model selection
-    model_choice = st.selectbox('Choose Model', list(models.keys()))
-
-    # Submit button
-    submit_button = st.form_submit_button(label='Predict Churn')
-
-# Prediction and output
-if submit_button:
-    # Map user input to the correct format
-    user_input = {
-        'Gender': gender, 
-        'Senior_Citizen': 'Yes' if senior_citizen == 'Yes' else 'No', 
-        'Partner': partner, 
-        'Dependents': dependents, 
-        'tenure': tenure, 
-        'Phone_Service': phone_service, 
-        'Multiple_Lines': multiple_lines, 
-        'Internet_Service': internet_service, 
-        'Online_Security': online_security, 
-        'Online_Backup': online_backup, 
-        'Device_Protection': device_protection, 
-        'Tech_Support': tech_support, 
-        'Streaming_TV': streaming_tv, 
-        'Streaming_Movies': streaming_movies, 
-        'Contract': contract, 
-        'Paperless_Billing': paperless_billing, 
-        'Payment_Method': payment_method, 
-        'Monthly_Charges': monthly_charges, 
-        'Total_Charges': total_charges
-    }
-
-    # Make the prediction
-    prediction, probability = predict(user_input, model_choice)
-    prediction_text = 'Churn' if prediction == 1 else 'No Churn'
+if not isinstance(st.session_state.get('history'), HistoryStore):
+    st.session_state.history = HistoryStore()
+
+# Choose between scoring a single customer and bulk scoring an uploaded file
+mode = st.radio("Prediction Mode", ["Single Customer", "Bulk Upload"], horizontal=True)
+
+if mode == "Single Customer":
+    # Check if the page is for predictions
+    st.markdown("### Enter Customer Details to Predict Churn")
+
+    # Create a form for user input
+    with st.form(key='user_input_form'):
+        gender = st.selectbox('Gender', ['Male', 'Female'])
+        senior_citizen = st.selectbox('Senior Citizen', ['Yes', 'No'])
+        partner = st.selectbox('Partner', ['Yes', 'No'])
+        dependents = st.selectbox('Dependents', ['Yes', 'No'])
+        tenure = st.slider('Tenure (in months)', 0, 100, 1)
+        phone_service = st.selectbox('Phone Service', ['Yes', 'No'])
+        multiple_lines = st.selectbox('Multiple Lines', ['Yes', 'No', 'No phone service'])
+        internet_service = st.selectbox('Internet Service', ['DSL', 'Fiber optic', 'No'])
+        online_security = st.selectbox('Online Security', ['Yes', 'No', 'No internet service'])
+        online_backup = st.selectbox('Online Backup', ['Yes', 'No', 'No internet service'])
+        device_protection = st.selectbox('Device Protection', ['Yes', 'No', 'No internet service'])
+        tech_support = st.selectbox('Tech Support', ['Yes', 'No', 'No internet service'])
+        streaming_tv = st.selectbox('Streaming TV', ['Yes', 'No', 'No internet service'])
+        streaming_movies = st.selectbox('Streaming Movies', ['Yes', 'No', 'No internet service'])
+        contract = st.selectbox('Contract', ['Month-to-month', 'One year', 'Two year'])
+        paperless_billing = st.selectbox('Paperless Billing', ['Yes', 'No'])
+        payment_method = st.selectbox('Payment Method', ['Electronic check', 'Mailed check', 'Bank transfer (automatic)', 'Credit card (automatic)'])
+        monthly_charges = st.number_input('Monthly Charges', 0.0, 200.0, 70.0)
+        total_charges = st.number_input('Total Charges', 0.0, 10000.0, 150.0)
+
+        # Model selection
+        model_choice = st.selectbox('Choose Model', list(models.keys()))
+        compare_all = st.checkbox('Compare all models', help="Score the customer with every model side by side, plus an averaged ensemble.")
+        threshold = st.slider('Churn threshold (compare mode)', 0.0, 1.0, 0.5, 0.01)
+
+        # Submit button
+        submit_button = st.form_submit_button(label='Predict Churn')
+
+    # Prediction and output
+    if submit_button:
+        # Map user input to the correct format
+        user_input = {
+            'Gender': gender, 
+            'Senior_Citizen': 'Yes' if senior_citizen == 'Yes' else 'No', 
+            'Partner': partner, 
+            'Dependents': dependents, 
+            'tenure': tenure, 
+            'Phone_Service': phone_service, 
+            'Multiple_Lines': multiple_lines, 
+            'Internet_Service': internet_service, 
+            'Online_Security': online_security, 
+            'Online_Backup': online_backup, 
+            'Device_Protection': device_protection, 
+            'Tech_Support': tech_support, 
+            'Streaming_TV': streaming_tv, 
+            'Streaming_Movies': streaming_movies, 
+            'Contract': contract, 
+            'Paperless_Billing': paperless_billing, 
+            'Payment_Method': payment_method, 
+            'Monthly_Charges': monthly_charges, 
+            'Total_Charges': total_charges
+        }
+
+        if compare_all:
+            # Preprocess once and score every model concurrently
+            results, ensemble_prob, transform_ms = compare_models(user_input, preprocessor, models, threshold, encoder=encoder)
+            ensemble_text = 'Churn' if ensemble_prob >= threshold else 'No Churn'
+
+            st.markdown(f"### Ensemble Prediction: {ensemble_text}")
+            st.markdown(f"**Averaged churn probability:** {ensemble_prob:.2f} (threshold {threshold:.2f})")
+            st.dataframe(results.style.format({'Churn_Probability': '{:.3f}', 'Inference_ms': '{:.1f}'}), hide_index=True)
+            st.caption(f"Preprocessing: {transform_ms:.1f} ms, run once for all {len(results)} models.")
+
+            # Display the churn probability of every model side by side
+            if charts.chart_backend() == "altair":
+                st.altair_chart(charts.model_comparison_spec(results, threshold), use_container_width=True)
+            else:
+                fig, ax = plt.subplots()
+                colors = ['red' if p >= threshold else 'green' for p in results['Churn_Probability']]
+                ax.barh(results['Model'], results['Churn_Probability'], color=colors)
+                ax.axvline(threshold, color='black', linestyle='--')
+                ax.set_xlim(0, 1)
+                ax.set_xlabel('Churn Probability')
+                st.pyplot(fig)
+                plt.close(fig)
+
+            # Store the ensemble result in history with date and time
+            current_time = datetime.now()
+            probability = ensemble_prob if ensemble_text == 'Churn' else 1 - ensemble_prob
+            st.session_state.history.append({
+                'Date': current_time.strftime('%Y-%m-%d'),
+                'Time': current_time.strftime('%H:%M:%S'),
+                'Prediction': ensemble_text,
+                'Model': 'ensemble (all models)',
+                'Probability': probability,
+                'Interpretation': f"Averaged churn probability of {ensemble_prob:.2%} across {', '.join(results['Model'])}.",
+            })
+
+        else:
+            # Make the prediction
+            prediction, probability = predict(user_input, model_choice)
+            prediction_text = 'Churn' if prediction == 1 else 'No Churn'
     
-    # Display the prediction
-    st.markdown(f"### Prediction: {prediction_text}")
-    st.markdown(f"**Probability:** {probability:.2f}")
-
-    # Display a probability bar chart
-    fig, ax = plt.subplots()
-    ax.barh(['No Churn', 'Churn'], [1 - probability, probability], color=['green', 'red'])
-    ax.set_xlim(0, 1)
-    st.pyplot(fig)
-
-    # Explanation or interpretation section
-    interpretation = f"The model predicts that the customer is {'likely' if prediction == 1 else 'not likely'} to churn with a confidence level of {probability:.2%}."
-    st.markdown("#### Interpretation")
-    st.write(interpretation)
-
-    # Store the predicted data in history with date and time
-    current_time = datetime.now()
-    new_record = pd.DataFrame({
-        'Date': [current_time.strftime('%Y-%m-%d')],
-        'Time': [current_time.strftime('%H:%M:%S')],
-        'Prediction': [prediction_text],
-        'Model': [model_choice],
-        'Probability': [probability],
-        'Interpretation': [interpretation],
-    })
-    st.session_state.history = pd.concat([st.session_state.history, new_record], ignore_index=True)
-
-# Option to view prediction history
+            # Display the prediction
+            st.markdown(f"### Prediction: {prediction_text}")
+            st.markdown(f"**Probability:** {probability:.2f}")
+
+            # Display a probability bar chart
+            if charts.chart_backend() == "altair":
+                st.altair_chart(charts.probability_spec(probability), use_container_width=True)
+            else:
+                fig, ax = plt.subplots()
+                ax.barh(['No Churn', 'Churn'], [1 - probability, probability], color=['green', 'red'])
+                ax.set_xlim(0, 1)
+                st.pyplot(fig)
+                plt.close(fig)
+
+            # Explanation or interpretation section
+            interpretation = f"The model predicts that the customer is {'likely' if prediction == 1 else 'not likely'} to churn with a confidence level of {probability:.2%}."
+            st.markdown("#### Interpretation")
+            st.write(interpretation)
+
+            # Store the predicted data in history with date and time
+            current_time = datetime.now()
+            st.session_state.history.append({
+                'Date': current_time.strftime('%Y-%m-%d'),
+                'Time': current_time.strftime('%H:%M:%S'),
+                'Prediction': prediction_text,
+                'Model': model_choice,
+                'Probability': probability,
+                'Interpretation': interpretation,
+            })
+
+else:
+    st.markdown("### Score Customers in Bulk")
+    customer_source = st.radio("Customers to score", ["Uploaded file", "Database snapshot"], horizontal=True)
+
+    uploaded_file = None
+    if customer_source == "Uploaded file":
+        st.write(f"Upload a CSV or Parquet file with the columns: {', '.join(expected_columns.keys())}. Missing columns are filled with default values.")
+        uploaded_file = st.file_uploader("Customer file", type=['csv', 'parquet'])
+    else:
+        st.write("Score every customer in the local snapshot of the database table (kept up to date by `python -m utils.snapshot`).")
+    bulk_model_choice = st.selectbox('Choose Model', list(models.keys()), key='bulk_model_choice')
+    chunk_size = st.number_input('Rows per chunk', min_value=100, max_value=100_000, value=10_000, step=1_000)
+
+    customers = None
+    if customer_source == "Uploaded file":
+        if uploaded_file is not None and st.button('Score File'):
+            customers = read_customer_file(uploaded_file)
+            source_name = uploaded_file.name
+            missing = [col for col in expected_columns if col not in customers.columns]
+            if missing:
+                st.warning(f"Filled missing columns with defaults: {', '.join(missing)}")
+    elif st.button('Score Snapshot'):
+        try:
+            from utils.snapshot import get_snapshot_loader  # Imports the database modules
+            snapshot = get_snapshot_loader().get()
+        except FileNotFoundError:
+            st.error("No snapshot yet. Run `python -m utils.snapshot` (or Sync on the Data page) first.")
+        else:
+            # Map the table's columns and values to the model's input schema, keeping the customer IDs
+            customers = dataset_to_expected(snapshot)
+            if 'Customer_ID' in snapshot.columns:
+                customers.insert(0, 'Customer_ID', snapshot['Customer_ID'].to_numpy())
+            source_name = "the database snapshot"
+
+    if customers is not None:
+        with st.spinner(f"Scoring {len(customers):,} customers..."):
+            model = models[bulk_model_choice]
+            result, rows_per_second = bulk_predict(customers, preprocessor, model, int(chunk_size))
+            per_row_speed = per_row_rows_per_second(customers, preprocessor, model)
+
+        # Report the throughput of the bulk path against the per-row path
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Rows scored", f"{len(result):,}")
+        col2.metric("Bulk throughput", f"{rows_per_second:,.0f} rows/s")
+        speedup = rows_per_second / per_row_speed if per_row_speed else 0
+        col3.metric("Per-row throughput", f"{per_row_speed:,.0f} rows/s", f"{speedup:,.1f}x speedup")
+
+        st.dataframe(result.head(100))
+        # Serialize the results chunk by chunk into download parts of about DOWNLOAD_MAX_BYTES
+        from utils.history_export import export_frame_csv  # Imports pyarrow
+        if 'bulk_export' in st.session_state:
+            st.session_state.bulk_export.remove()  # Only the latest export is kept on disk
+        st.session_state.bulk_export = export_frame_csv(result, "bulk_predictions.csv", int(chunk_size))
+
+        # Store the bulk results in history with date and time
+        current_time = datetime.now()
+        n_rows = len(result)
+        st.session_state.history.extend({
+            'Date': [current_time.strftime('%Y-%m-%d')] * n_rows,
+            'Time': [current_time.strftime('%H:%M:%S')] * n_rows,
+            'Prediction': result['Prediction'].to_numpy(),
+            'Model': [bulk_model_choice] * n_rows,
+            'Probability': result['Probability'].to_numpy(),
+            'Interpretation': [f"Bulk scored from {source_name}"] * n_rows,
+        })
+
+    # Offer the last scored file, one part at a time, so it survives the reruns of choosing a part
+    if 'bulk_export' in st.session_state:
+        parts = st.session_state.bulk_export
+        if not parts.available():
+            del st.session_state.bulk_export
+            st.info("The scored file has expired. Score the customers again to download it.")
+        else:
+            part = 0
+            if len(parts.paths) > 1:
+                st.info(f"The scored file is {parts.size() / 1024 / 1024:,.0f} MB, so it is split into {len(parts.paths)} CSV files of about {parts.max_bytes / 1024 / 1024:,.0f} MB, each with the header row.")
+                names = [parts.file_name(i) for i in range(len(parts.paths))]
+                part = names.index(st.selectbox("Part", names))
+            st.download_button(
+                label="Download Scored Customers as CSV",
+                data=parts.read(part),
+                file_name=parts.file_name(part),
+                mime="text/csv",
+            )
+
+# Option to view the most recent predictions (the History page shows all of them)
 st.markdown("### Prediction History")
 if len(st.session_state.history) > 0:
-    st.dataframe(st.session_state.history)
+    st.dataframe(st.session_state.history.tail(20))
 else:
     st.write("No predictions made yet.")
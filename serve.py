@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from streamlit.web import bootstrap
+
+from utils.warmup import get_warm_up
+
+# Start the Streamlit app with a warm-up stage and a readiness endpoint:
+#   python serve.py
+# The warm-up runs in the same process as the pages, so the model bundle, encoder,
+# dataset and aggregate cube it loads are the ones the first sessions use. Point the
+# load balancer's readiness check at http://<host>:READINESS_PORT/ready, which answers
+# 503 until the warm-up has finished and 200 afterwards.
+main_dir = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = os.path.join(main_dir, "app.py")
+SERVER_PORT = int(os.getenv("STREAMLIT_SERVER_PORT", "8501"))
+READINESS_PORT = int(os.getenv("READINESS_PORT", "8502"))
+
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+    # Answers GET /ready with the warm-up status: 200 when ready, 503 until then
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/ready':
+            self.send_error(404)
+            return
+        status = get_warm_up().status()
+        body = json.dumps(status).encode()
+        self.send_response(200 if status['ready'] else 503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Health checks would flood the log
+
+
+# Function to serve /ready on its own port in a background thread
+def start_readiness_server(port=READINESS_PORT):
+    server = ThreadingHTTPServer(('0.0.0.0', port), ReadinessHandler)
+    threading.Thread(target=server.serve_forever, name='readiness', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the Streamlit app after warming up the shared model and data caches.")
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help="Streamlit server port")
+    parser.add_argument('--readiness-port', type=int, default=READINESS_PORT, help="Port of the /ready endpoint (0 disables it)")
+    parser.add_argument('--wait', action='store_true', help="Finish the warm-up before the Streamlit server starts listening")
+    args = parser.parse_args()
+
+    warm_up = get_warm_up().start()
+    if args.readiness_port:
+        start_readiness_server(args.readiness_port)
+    if args.wait:
+        warm_up.wait()
+        print(f"Warm-up {'finished' if warm_up.ready else 'failed'}: {warm_up.status()}")
+
+    flag_options = {'server_port': args.port}
+    bootstrap.load_config_options(flag_options=flag_options)
+    bootstrap.run(APP_SCRIPT, False, [], flag_options)
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, main_dir)
+
+from models.create_model_components import build_preprocessor  # noqa: E402
+from utils.datasets import DEFAULT_DATASET_PATH  # noqa: E402
+from utils.model_bundle import write_bundle  # noqa: E402
+from utils.scoring import dataset_to_expected  # noqa: E402
+
+
+# datasets/dn.csv in the expected schema
+@pytest.fixture(scope='session')
+def customers():
+    return dataset_to_expected(pd.read_csv(DEFAULT_DATASET_PATH))
+
+
+# The preprocessor the model bundle is built with, fitted on datasets/dn.csv
+@pytest.fixture(scope='session')
+def preprocessor(customers):
+    return build_preprocessor().fit(customers)
+
+
+# A small model bundle with the four models the app expects, built in a temp directory
+# (models/bundles is not committed); pass its path as MODEL_BUNDLE_PATH
+@pytest.fixture(scope='session')
+def model_bundle(tmp_path_factory, customers, preprocessor):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.svm import SVC
+    from xgboost import XGBClassifier
+
+    raw = pd.read_csv(DEFAULT_DATASET_PATH).head(500)
+    features = preprocessor.transform(customers.head(500))
+    target = (raw['Churn'] == 'Yes').astype(int)
+    models = {
+        'svm': SVC(probability=True, random_state=42),
+        'random_forest': RandomForestClassifier(n_estimators=5, max_depth=4, random_state=42),
+        'xgboost': XGBClassifier(n_estimators=5, max_depth=3, random_state=42),
+        'knn': KNeighborsClassifier(),
+    }
+    components = {
+        'preprocessing': {'preprocessor': preprocessor},
+        'tuned_models': {name: model.fit(features, target) for name, model in models.items()},
+    }
+    output_dir = str(tmp_path_factory.mktemp('bundles'))
+    write_bundle(components, output_dir, customers.head(5))
+    return output_dir
@@ -0,0 +1,30 @@
+import threading
+
+from utils.batching import MicroBatcher
+
+
+def test_cancelled_request_does_not_stop_the_worker():
+    started, release = threading.Event(), threading.Event()
+
+    def score(records, key):
+        started.set()
+        release.wait(10)
+        return [record['value'] for record in records]
+
+    batcher = MicroBatcher(score, window_ms=1)
+    first = batcher.submit({'value': 0}, 'a')
+    assert started.wait(10)  # The worker is scoring the first batch
+    cancelled = batcher.submit({'value': 1}, 'a')
+    assert cancelled.cancel()  # Still queued, like a /predict whose client went away
+    release.set()
+
+    assert first.result(timeout=10) == 0
+    assert batcher.predict({'value': 2}, 'a', timeout=10) == 2
+    assert batcher._worker.is_alive()
+
+
+def test_wrong_result_count_fails_every_request_of_the_group():
+    batcher = MicroBatcher(lambda records, key: records[:-1], window_ms=1)
+    future = batcher.submit({'value': 0}, 'a')
+    assert isinstance(future.exception(timeout=10), RuntimeError)
+    assert batcher._worker.is_alive()
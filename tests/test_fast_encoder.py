@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from utils.fast_encoder import FastEncoder
+
+
+# Function to turn a sparse or dense transform result into a dense array
+def dense(matrix):
+    return np.asarray(matrix.toarray() if hasattr(matrix, 'toarray') else matrix, dtype=float)
+
+
+@pytest.fixture(scope='module')
+def encoder(preprocessor):
+    return FastEncoder(preprocessor)
+
+
+def test_matches_preprocessor_on_dataset(encoder, preprocessor, customers):
+    assert np.allclose(dense(encoder.transform(customers)), dense(preprocessor.transform(customers)))
+
+
+def test_matches_preprocessor_on_unseen_categories(encoder, preprocessor, customers):
+    frame = customers.head(20).copy()
+    frame['Contract'] = 'Ten-year'
+    frame.loc[frame.index[::2], 'Payment_Method'] = 'Cash'
+    frame.loc[frame.index[::3], 'Gender'] = ''
+    assert np.allclose(dense(encoder.transform(frame)), dense(preprocessor.transform(frame)))
+
+
+def test_matches_preprocessor_on_missing_values(encoder, preprocessor, customers):
+    frame = customers.head(20).copy()
+    frame.loc[frame.index[::2], ['tenure', 'Monthly_Charges']] = np.nan
+    frame.loc[frame.index[1::3], 'Total_Charges'] = np.nan
+    frame.loc[frame.index[::3], ['Contract', 'Internet_Service']] = np.nan
+    frame.loc[frame.index[1::4], 'Payment_Method'] = None
+    assert np.allclose(dense(encoder.transform(frame)), dense(preprocessor.transform(frame)))
+
+
+def test_records_match_frame(encoder, customers):
+    records = customers.head(5).to_dict(orient='records')
+    assert np.allclose(dense(encoder.transform_records(records)), dense(encoder.transform(customers.head(5))))
@@ -0,0 +1,24 @@
+import pytest
+
+from utils.startup_profile import DEFAULT_ENV, FORBIDDEN_IMPORTS, run_page
+
+# Something each page renders only once it has got past its setup, so a page that
+# stopped early (no bundle, missing data) or raised cannot pass for lack of imports
+PAGE_BODY_MARKERS = {
+    'app': 'Menu',
+    'about': 'Visit Our GitHub Repository',
+    'dashboard': '**Types of Contracts**',
+    'history': 'No predictions have been made yet.',
+    'prediction': 'Prediction Mode',
+}
+
+
+# Each page runs once in a fresh interpreter; a heavy library in sys.modules afterwards
+# means an import that should be deferred has moved back to the page's first run
+@pytest.mark.parametrize('page', sorted(FORBIDDEN_IMPORTS))
+def test_page_does_not_import_heavy_modules(page, model_bundle):
+    run = run_page(page, {**DEFAULT_ENV, 'MODEL_BUNDLE_PATH': model_bundle})
+    assert run['exceptions'] == []
+    assert run['errors'] == []
+    assert PAGE_BODY_MARKERS[page] in run['rendered']
+    assert not set(run['modules']) & set(FORBIDDEN_IMPORTS[page])
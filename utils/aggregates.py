@@ -0,0 +1,152 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.datasets import DEFAULT_DATASET_PATH, get_dataset_loader
+
+# Bin widths of the fixed histograms for the charge distributions
+HISTOGRAM_BIN_WIDTHS = {'Monthly_Charges': 5.0, 'Total_Charges': 250.0}
+
+# Number of dataset versions whose cubes are kept
+MAX_CACHED_CUBES = 4
+
+# Default data source of the dashboard: "csv" (datasets/dn.csv), "snapshot" (the local
+# Parquet copy of the SQL table, see utils/snapshot.py) or "sql" (GROUP BY queries run by
+# the database, see utils/sql_aggregates.py)
+DASHBOARD_SOURCE = os.getenv("DASHBOARD_SOURCE", "csv").lower()
+DASHBOARD_SOURCES = {'csv': "CSV file", 'snapshot': "Database snapshot", 'sql': "Database (SQL aggregation)"}
+
+
+# Function to replace categorical index levels with plain values so tables from
+# different batches of rows align when added together
+def plain_index(table):
+    if isinstance(table.index, pd.MultiIndex):
+        table.index = pd.MultiIndex.from_tuples(table.index.to_list(), names=table.index.names)
+    else:
+        table.index = pd.Index(table.index.to_list(), name=table.index.name)
+    return table
+
+
+class AggregateCube:
+    # Counts and sums behind every EDA chart, computed together when the dataset loads.
+    # Every table is additive, so appended rows are folded in with update() and the
+    # charts are rendered from these small tables instead of the raw rows.
+
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+        self.row_count = 0
+
+    # Function to compute the additive tables for a frame
+    @staticmethod
+    def partials(frame):
+        columns = set(frame.columns)
+        tables = {}
+        for col in ['Contract', 'Gender', 'Senior_Citizen']:
+            if col in columns:
+                tables[col] = frame.groupby(col, observed=True).size()
+        if {'Payment_Method', 'Churn'} <= columns:
+            tables['payment_churn'] = frame.groupby(['Payment_Method', 'Churn'], observed=True).size()
+        if {'Partner', 'Churn', 'Tenure_Months', 'Monthly_Charges'} <= columns:
+            grouped = frame.groupby(['Partner', 'Churn'], observed=True)
+            tables['partner_churn'] = pd.concat({
+                'count': grouped.size(),
+                'Tenure_Months': grouped['Tenure_Months'].sum(),
+                'Monthly_Charges': grouped['Monthly_Charges'].sum(),
+            }, axis=1)
+        if {'Tenure_Months', 'Total_Charges'} <= columns:
+            grouped = frame.dropna(subset=['Total_Charges']).groupby('Tenure_Months')
+            tables['tenure_total'] = pd.concat({'count': grouped.size(), 'Total_Charges': grouped['Total_Charges'].sum()}, axis=1)
+        for col, width in HISTOGRAM_BIN_WIDTHS.items():
+            if col in columns:
+                bins = np.floor(frame[col].dropna().to_numpy() / width).astype(np.int64)
+                tables[f'{col}_hist'] = pd.Series(bins).value_counts().sort_index()
+        return {name: plain_index(table) for name, table in tables.items()}
+
+    @classmethod
+    def from_frame(cls, frame):
+        cube = cls(cls.partials(frame))
+        cube.row_count = len(frame)
+        return cube
+
+    def copy(self):
+        cube = AggregateCube({name: table.copy() for name, table in self.tables.items()})
+        cube.row_count = self.row_count
+        return cube
+
+    # Function to fold appended rows into the tables (and remove replaced rows, if given)
+    def update(self, added=None, removed=None):
+        for frame, sign in [(added, 1), (removed, -1)]:
+            if frame is None or len(frame) == 0:
+                continue
+            for name, table in self.partials(frame).items():
+                if name in self.tables:
+                    merged = self.tables[name].add(sign * table, fill_value=0)
+                else:
+                    merged = sign * table
+                self.tables[name] = merged.sort_index()
+            self.row_count += sign * len(frame)
+        return self
+
+    def has(self, name):
+        return name in self.tables
+
+    # Function to return the category counts of Contract, Gender or Senior_Citizen
+    def counts(self, col):
+        counts = self.tables[col]
+        return counts[counts > 0].astype(int).sort_values(ascending=False)
+
+    # Function to return the churn share per payment method (rows sum to 1)
+    def churn_rate_by_payment(self):
+        counts = self.tables['payment_churn'].unstack(fill_value=0)
+        return counts.div(counts.sum(axis=1), axis=0)
+
+    # Function to return mean tenure and monthly charges by Partner and Churn
+    def partner_churn_means(self):
+        table = self.tables['partner_churn']
+        table = table[table['count'] > 0]
+        means = table[['Tenure_Months', 'Monthly_Charges']].div(table['count'], axis=0)
+        return means.reset_index()
+
+    # Function to return mean total charges per tenure value
+    def tenure_total_means(self):
+        table = self.tables['tenure_total']
+        table = table[table['count'] > 0]
+        return (table['Total_Charges'] / table['count']).rename('Total_Charges').reset_index()
+
+    # Function to return a charge column's histogram as a frame of bin centers and counts,
+    # plus the bin range, for sns.histplot(weights='count', binwidth=..., binrange=...)
+    def histogram(self, col):
+        counts = self.tables[f'{col}_hist']
+        counts = counts[counts > 0]
+        width = HISTOGRAM_BIN_WIDTHS[col]
+        bins = np.arange(counts.index.min(), counts.index.max() + 2)
+        full = counts.reindex(bins[:-1], fill_value=0)
+        return pd.DataFrame({col: (bins[:-1] + 0.5) * width, 'count': full.to_numpy()}), (bins[0] * width, bins[-1] * width)
+
+
+# Cubes per dataset version, shared by every session
+_cubes = {}
+_cubes_lock = threading.Lock()
+
+
+# Function to get the cube of the current dataset version
+# If the loader reports rows appended to a version that already has a cube, the cube
+# is updated incrementally instead of being recomputed. Another loader with the same
+# interface (get(), version, last_append), such as the SQL snapshot's, can be passed.
+def get_aggregate_cube(path=DEFAULT_DATASET_PATH, loader=None):
+    loader = loader or get_dataset_loader(path)
+    frame = loader.get()
+    version = loader.version
+    with _cubes_lock:
+        if version not in _cubes:
+            append = loader.last_append
+            if append is not None and append[0] in _cubes:
+                cube = _cubes[append[0]].copy().update(append[1])
+            else:
+                cube = AggregateCube.from_frame(frame)
+            _cubes[version] = cube
+            while len(_cubes) > MAX_CACHED_CUBES:
+                _cubes.pop(next(iter(_cubes)))
+        return _cubes[version], version
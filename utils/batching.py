@@ -0,0 +1,148 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, InvalidStateError
+
+import numpy as np
+
+from utils.fast_encoder import get_fast_encoder
+from utils.scoring import predict_records
+from utils.tree_engine import get_tree_models
+
+# How long the first request of a batch waits for others to join, and the largest batch.
+# A window of 0 disables coalescing and every request is scored on its own.
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "2"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+
+
+class MicroBatcher:
+    # Coalesces concurrent single-record requests into one vectorized call.
+    # score_fn(records, key) must return one result per record, in order; requests
+    # are grouped by key (the model name) inside each batch.
+
+    def __init__(self, score_fn, window_ms=MICROBATCH_WINDOW_MS, max_batch_size=MICROBATCH_MAX_SIZE, metrics_window=10_000):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_delays_ms = deque(maxlen=metrics_window)
+        self._requests = 0
+        self._batches = 0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    # Function to queue one record and return a Future with its result
+    def submit(self, record, key):
+        future = Future()
+        self._queue.put((record, key, future, time.perf_counter()))
+        return future
+
+    # Function to queue one record and wait for its result
+    def predict(self, record, key, timeout=None):
+        return self.submit(record, key).result(timeout=timeout)
+
+    # Function to collect up to max_batch_size requests within the window after the first one
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][3] + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    # Function to mark a queued future as running; False if it was cancelled or already resolved
+    @staticmethod
+    def _claim(future):
+        try:
+            return future.set_running_or_notify_cancel()
+        except RuntimeError:
+            return False
+
+    # Function to set a future's result or exception without letting a bad future stop the worker
+    @staticmethod
+    def _deliver(future, result=None, error=None):
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass  # Already resolved elsewhere; the other requests are unaffected
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            dispatched_at = time.perf_counter()
+
+            # Claim every future; requests cancelled while queued (e.g. a client that
+            # disconnected) are dropped instead of scored
+            groups = {}
+            for item in batch:
+                if self._claim(item[2]):
+                    groups.setdefault(item[1], []).append(item)
+
+            for key, items in groups.items():
+                futures = [item[2] for item in items]
+                try:
+                    results = list(self.score_fn([item[0] for item in items], key))
+                    if len(results) != len(futures):
+                        # Results can no longer be matched to requests, so fail the whole group
+                        raise RuntimeError(f"score_fn returned {len(results)} results for {len(futures)} records")
+                except Exception as e:
+                    for future in futures:
+                        self._deliver(future, error=e)
+                    continue
+                for future, result in zip(futures, results):
+                    self._deliver(future, result)
+
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._batch_sizes[len(batch)] += 1
+                self._queue_delays_ms.extend((dispatched_at - item[3]) * 1000 for item in batch)
+
+    # Function to report batch size and queueing delay metrics
+    def metrics(self):
+        with self._lock:
+            delays = np.fromiter(self._queue_delays_ms, dtype=float)
+            return {
+                'requests': self._requests,
+                'batches': self._batches,
+                'mean_batch_size': self._requests / self._batches if self._batches else 0.0,
+                'max_batch_size': max(self._batch_sizes) if self._batch_sizes else 0,
+                'batch_size_counts': dict(sorted(self._batch_sizes.items())),
+                'queue_delay_p50_ms': float(np.percentile(delays, 50)) if len(delays) else 0.0,
+                'queue_delay_p99_ms': float(np.percentile(delays, 99)) if len(delays) else 0.0,
+            }
+
+
+# Process-wide batchers, one per model registry
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+# Function to get the shared prediction batcher for a model registry
+# Returns None when coalescing is disabled (MICROBATCH_WINDOW_MS=0).
+def get_prediction_batcher(registry):
+    if MICROBATCH_WINDOW_MS <= 0:
+        return None
+
+    def score(records, model_name):
+        components = registry.get()
+        preprocessor = components['preprocessing']['preprocessor']
+        encoder, _ = get_fast_encoder(registry)
+        models, _ = get_tree_models(registry)
+        return predict_records(records, preprocessor, models[model_name], encoder)
+
+    with _batchers_lock:
+        if registry.path not in _batchers:
+            _batchers[registry.path] = MicroBatcher(score)
+        return _batchers[registry.path]
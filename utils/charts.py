@@ -0,0 +1,114 @@
+import os
+
+import pandas as pd
+
+from utils.lazy_imports import lazy_module, module_available
+
+# Chart backend of this deployment: "altair" sends Vega-Lite specs with the aggregated
+# data and the browser draws them; "matplotlib" renders images on the server.
+CHART_BACKEND = os.getenv("CHART_BACKEND", "altair").lower()
+
+# Altair is imported when the first chart is built; without it charts fall back to
+# server-side matplotlib images
+alt = lazy_module('altair') if module_available('altair') else None
+
+
+# Function to return the backend in use ("altair" only if requested and importable)
+def chart_backend():
+    if CHART_BACKEND == "altair" and alt is not None:
+        return "altair"
+    return "matplotlib"
+
+
+# Function to turn a category count series into a two-column frame for a bar chart
+def counts_frame(counts, label):
+    return pd.DataFrame({label: [str(value) for value in counts.index], 'Count': counts.to_numpy()})
+
+
+# Function to build a bar chart of category counts (horizontal bars if horizontal=True)
+def count_bar_spec(counts, label, title, color, horizontal=False):
+    data = counts_frame(counts, label)
+    category = alt.X(f'{label}:N', sort='-y') if not horizontal else alt.Y(f'{label}:N', sort='-x')
+    value = alt.Y('Count:Q') if not horizontal else alt.X('Count:Q')
+    return alt.Chart(data, title=title).mark_bar(color=color).encode(
+        category, value, tooltip=[label, 'Count']
+    )
+
+
+# Function to build a histogram from pre-binned counts (bin centers and bin width)
+def histogram_spec(histogram, col, bin_width, title):
+    data = histogram.assign(bin_start=histogram[col] - bin_width / 2, bin_end=histogram[col] + bin_width / 2)
+    return alt.Chart(data, title=title).mark_bar(color='steelblue').encode(
+        alt.X('bin_start:Q', title=col),
+        alt.X2('bin_end:Q'),
+        alt.Y('count:Q', title='Count'),
+        tooltip=[alt.Tooltip('bin_start:Q', title='From'), alt.Tooltip('bin_end:Q', title='To'), 'count:Q'],
+    )
+
+
+# Function to build a pie chart from labels and counts
+def pie_spec(labels, counts, colors, title):
+    data = pd.DataFrame({'Group': labels, 'Count': counts})
+    data['Share'] = data['Count'] / max(data['Count'].sum(), 1)
+    return alt.Chart(data, title=title).mark_arc().encode(
+        alt.Theta('Count:Q'),
+        alt.Color('Group:N', scale=alt.Scale(domain=labels, range=colors)),
+        tooltip=['Group', 'Count', alt.Tooltip('Share:Q', format='.0%')],
+    )
+
+
+# Function to build the stacked churn-rate bars per payment method
+def churn_rate_spec(churn_rates, title):
+    data = churn_rates.rename_axis(index='Payment_Method', columns='Churn').stack().rename('Churn Rate').reset_index()
+    data['Churn'] = data['Churn'].astype(str)
+    return alt.Chart(data, title=title).mark_bar().encode(
+        alt.X('Payment_Method:N', title='Payment Method'),
+        alt.Y('Churn Rate:Q', stack='zero'),
+        alt.Color('Churn:N', scale=alt.Scale(range=['green', 'red'])),
+        tooltip=['Payment_Method', 'Churn', alt.Tooltip('Churn Rate:Q', format='.1%')],
+    )
+
+
+# Function to build grouped bars of a mean value by Partner and Churn
+def partner_churn_spec(means, value, title, y_title):
+    data = means.astype({'Partner': str, 'Churn': str})
+    return alt.Chart(data, title=title).mark_bar().encode(
+        alt.X('Partner:N', title='Partner Status'),
+        alt.XOffset('Churn:N'),
+        alt.Y(f'{value}:Q', title=y_title),
+        alt.Color('Churn:N', scale=alt.Scale(scheme='pastel1')),
+        tooltip=['Partner', 'Churn', alt.Tooltip(f'{value}:Q', format='.2f')],
+    )
+
+
+# Function to build the line of mean total charges per tenure value
+def tenure_total_spec(tenure_means, title):
+    return alt.Chart(tenure_means, title=title).mark_line(point=True, color='steelblue').encode(
+        alt.X('Tenure_Months:O', title='Tenure'),
+        alt.Y('Total_Charges:Q', title='Mean Total Charges'),
+        tooltip=['Tenure_Months', alt.Tooltip('Total_Charges:Q', format='.2f')],
+    )
+
+
+# Function to build the No Churn / Churn probability bar of a single prediction
+def probability_spec(probability):
+    data = pd.DataFrame({'Outcome': ['No Churn', 'Churn'], 'Probability': [1 - probability, probability]})
+    return alt.Chart(data).mark_bar().encode(
+        alt.X('Probability:Q', scale=alt.Scale(domain=[0, 1])),
+        alt.Y('Outcome:N', sort=['No Churn', 'Churn'], title=None),
+        alt.Color('Outcome:N', scale=alt.Scale(domain=['No Churn', 'Churn'], range=['green', 'red']), legend=None),
+        tooltip=['Outcome', alt.Tooltip('Probability:Q', format='.2%')],
+    )
+
+
+# Function to build the per-model churn probability bars with the threshold marked
+def model_comparison_spec(results, threshold):
+    data = results[['Model', 'Churn_Probability']].assign(Churn=results['Churn_Probability'] >= threshold)
+    bars = alt.Chart(data).mark_bar().encode(
+        alt.X('Churn_Probability:Q', title='Churn Probability', scale=alt.Scale(domain=[0, 1])),
+        alt.Y('Model:N', title=None),
+        alt.Color('Churn:N', scale=alt.Scale(domain=[False, True], range=['green', 'red']), legend=None),
+        tooltip=['Model', alt.Tooltip('Churn_Probability:Q', format='.3f')],
+    )
+    rule = alt.Chart(pd.DataFrame({'threshold': [threshold]})).mark_rule(color='black', strokeDash=[4, 4]).encode(x='threshold:Q')
+    return bars + rule
@@ -0,0 +1,198 @@
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import and_, column, distinct, func, inspect, literal_column, or_, select, table
+
+from utils.database import DATA_TABLE
+from utils.query_cache import database_id, get_query_cache
+
+# Columns the browser can filter on and sort by; Customer_ID is the unique key that
+# makes the ordering total, so pages can be fetched with keyset (seek) pagination.
+KEY_COLUMN = 'Customer_ID'
+FILTER_COLUMNS = ['Contract', 'Churn', 'Payment_Method']
+SORT_COLUMNS = ['Customer_ID', 'Tenure_Months', 'Monthly_Charges']
+PAGE_SIZES = [25, 50, 100, 500]
+DEFAULT_STREAM_CHUNK_SIZE = 5_000
+
+
+# Function to split "schema.table" into its schema (None if absent) and table name
+def split_table_name(name):
+    schema, _, table_name = name.rpartition('.')
+    return schema or None, table_name
+
+
+class DataBrowser:
+    # Builds parameterized page queries for one table: only the chosen columns, rows
+    # matching the filters, and one page after the last (sort value, Customer_ID) seen.
+    # With an index on Customer_ID (or on the sort column plus Customer_ID) every page is
+    # an index seek, however deep the user pages.
+
+    def __init__(self, engine, table_name=DATA_TABLE, cache=None):
+        self.engine = engine
+        self.cache = cache
+        self.table_name = table_name
+        schema, name = split_table_name(table_name)
+        self.columns = [col['name'] for col in inspect(engine).get_columns(name, schema=schema)]
+        self.table = table(name, *[column(col) for col in self.columns], schema=schema)
+        self._distinct = {}
+
+    # Function to build the WHERE clauses of the filters ({column: [allowed values]})
+    def _conditions(self, filters):
+        return [self.table.c[col].in_(values) for col, values in (filters or {}).items() if values]
+
+    # Function to list the values of a filter column (cached, they rarely change)
+    def distinct_values(self, col):
+        if col not in self._distinct:
+            c = self.table.c[col]
+            with self.engine.connect() as conn:
+                self._distinct[col] = [row[0] for row in conn.execute(select(distinct(c)).where(c.is_not(None)).order_by(c))]
+        return self._distinct[col]
+
+    # Function to fingerprint the table: row count and max key, plus a checksum of every
+    # row on SQL Server. Used to revalidate cached results; the query cache runs it at
+    # most once per TTL for the table.
+    def probe(self):
+        key = self.table.c[KEY_COLUMN]
+        probes = [func.count(), func.max(key)]
+        if self.engine.dialect.name == 'mssql':
+            probes.append(func.checksum_agg(func.binary_checksum(literal_column('*'))))
+        with self.engine.connect() as conn:
+            return list(conn.execute(select(*probes).select_from(self.table)).one())
+
+    # Function to run a select as a DataFrame, through the query cache if there is one
+    # Returns (frame, cache status or None).
+    def read(self, statement):
+        def fetch():
+            with self.engine.connect() as conn:
+                result = conn.execute(statement)
+                return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+        if self.cache is None:
+            return fetch(), None
+        compiled = statement.compile(dialect=self.engine.dialect)
+        return self.cache.get_or_fetch(str(compiled), compiled.params, fetch, self.probe, database_id(self.engine), self.table_name)
+
+    # Function to count the rows matching the filters
+    def count(self, filters=None):
+        frame, _ = self.read(select(func.count().label('rows')).select_from(self.table).where(*self._conditions(filters)))
+        return int(frame['rows'].iloc[0])
+
+    # Function to build the ordered select of the chosen columns and filters
+    # after is the (sort value, Customer_ID) cursor of the last row already shown, or None.
+    def select_statement(self, columns, filters=None, sort_column=KEY_COLUMN, descending=False, after=None):
+        key = self.table.c[KEY_COLUMN]
+        sort = self.table.c[sort_column]
+        selected = [KEY_COLUMN] + [col for col in columns if col != KEY_COLUMN]
+        if sort_column not in selected:
+            selected.append(sort_column)
+
+        conditions = self._conditions(filters)
+        if after is not None:
+            sort_value, key_value = after
+            if sort_column == KEY_COLUMN:
+                conditions.append(key < key_value if descending else key > key_value)
+            elif descending:
+                conditions.append(or_(sort < sort_value, and_(sort == sort_value, key < key_value)))
+            else:
+                conditions.append(or_(sort > sort_value, and_(sort == sort_value, key > key_value)))
+
+        order = [sort.desc(), key.desc()] if descending else [sort, key]
+        if sort_column == KEY_COLUMN:
+            order = order[:1]
+        return select(*[self.table.c[col] for col in selected]).where(*conditions).order_by(*order)
+
+    # Function to fetch one page of rows
+    # after is the cursor of the previous page's last row, or None for the first page.
+    # Returns (frame, cursor of this page's last row or None if it was the last page,
+    # query milliseconds, cache status or None).
+    def fetch_page(self, columns, filters=None, sort_column=KEY_COLUMN, descending=False, page_size=50, after=None):
+        # Fetch one extra row to know whether another page follows
+        statement = self.select_statement(columns, filters, sort_column, descending, after).limit(page_size + 1)
+
+        start = time.perf_counter()
+        frame, cache_status = self.read(statement)
+        query_ms = (time.perf_counter() - start) * 1000
+
+        cursor = None
+        if len(frame) > page_size:
+            last = frame.iloc[page_size - 1]
+            cursor = tuple(value.item() if hasattr(value, 'item') else value for value in (last[sort_column], last[KEY_COLUMN]))
+        shown = [KEY_COLUMN] + [col for col in columns if col != KEY_COLUMN]
+        return frame.iloc[:page_size][shown], cursor, query_ms, cache_status
+
+    # Function to stream every matching row as Arrow tables of up to chunk_size rows
+    # The rows come from one server-side cursor, fetched a chunk at a time.
+    def stream(self, columns, filters=None, sort_column=KEY_COLUMN, descending=False, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        statement = self.select_statement(columns, filters, sort_column, descending)
+        shown = [KEY_COLUMN] + [col for col in columns if col != KEY_COLUMN]
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(statement)
+            keys = list(result.keys())
+            for rows in result.partitions(chunk_size):
+                yield pa.Table.from_pandas(pd.DataFrame(rows, columns=keys)[shown], preserve_index=False)
+
+
+# Browsers per engine and table, so the table's columns are reflected once
+_browsers = {}
+_browsers_lock = threading.Lock()
+
+
+# Function to get the shared browser of a table (its pages and counts use the query cache)
+def get_data_browser(engine, table_name=DATA_TABLE):
+    with _browsers_lock:
+        key = (id(engine), table_name)
+        if key not in _browsers:
+            _browsers[key] = DataBrowser(engine, table_name, cache=get_query_cache())
+        return _browsers[key]
+
+
+# Compare a full-table read with keyset and OFFSET page fetches on a large SQLite table
+if __name__ == '__main__':
+    import argparse
+    import os
+    import tempfile
+
+    from utils.database import create_pooled_engine
+    from utils.datasets import DEFAULT_DATASET_PATH
+
+    parser = argparse.ArgumentParser(description="Benchmark keyset pagination against a SQLite copy of dn.csv.")
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=200, help="How deep to page")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_pooled_engine(f"sqlite:///{os.path.join(tmp, 'churn.db')}")
+        source = pd.read_csv(DEFAULT_DATASET_PATH)
+        frame = source.sample(args.rows, replace=True, random_state=0).reset_index(drop=True)
+        frame['Customer_ID'] = [f"{i:08d}-{cid}" for i, cid in enumerate(frame['Customer_ID'])]
+        frame.to_sql('churn', engine, index=False, chunksize=50_000)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE UNIQUE INDEX ix_churn_customer ON churn (Customer_ID)")
+
+        browser = DataBrowser(engine, 'churn')
+        filters = {'Contract': ['Month-to-month'], 'Churn': ['Yes']}
+        columns = ['Customer_ID', 'Contract', 'Churn', 'Payment_Method', 'Monthly_Charges']
+
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            pd.read_sql("SELECT * FROM churn", conn)
+        print(f"SELECT * ({args.rows:,} rows):        {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+        cursor = None
+        for _ in range(args.pages):
+            page, cursor, query_ms, _ = browser.fetch_page(columns, filters, page_size=args.page_size, after=cursor)
+        print(f"keyset page {args.pages}:                  {query_ms:9.1f} ms")
+
+        statement = (
+            f"SELECT {', '.join(columns)} FROM churn WHERE Contract = ? AND Churn = ? "
+            f"ORDER BY Customer_ID LIMIT {args.page_size} OFFSET {(args.pages - 1) * args.page_size}"
+        )
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            offset_page = pd.read_sql(statement, conn, params=('Month-to-month', 'Yes'))
+        print(f"OFFSET page {args.pages}:                  {(time.perf_counter() - start) * 1000:9.1f} ms")
+        print("pages match:", offset_page.reset_index(drop=True).equals(page.reset_index(drop=True)))
+        engine.dispose()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import uuid
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Memory allowed for streamed rows kept for display, and where rows past it are spilled
+STREAM_MEMORY_CAP_MB = int(os.getenv("STREAM_MEMORY_CAP_MB", "256"))
+DATA_SPILL_DIR = os.getenv("DATA_SPILL_DIR", tempfile.gettempdir())
+
+
+class ChunkCollector:
+    # Collects streamed Arrow chunks in memory up to a byte cap.
+    # Once the next chunk would pass the cap, the fetch either stops (spill=False) or the
+    # remaining chunks are appended to a Parquet file in DATA_SPILL_DIR (spill=True), so the
+    # process never holds more than the cap.
+
+    def __init__(self, memory_cap_bytes=STREAM_MEMORY_CAP_MB * 1024 * 1024, spill=False, spill_dir=DATA_SPILL_DIR):
+        self.memory_cap_bytes = memory_cap_bytes
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self.chunks = []
+        self.memory_bytes = 0
+        self.rows_in_memory = 0
+        self.rows_spilled = 0
+        self.spill_path = None
+        self.stopped = False  # The cap was reached without spilling
+        self.finished = False  # Every row was read
+        self._writer = None
+
+    @property
+    def rows(self):
+        return self.rows_in_memory + self.rows_spilled
+
+    # Function to take one chunk; returns 'memory', 'spilled' or 'stopped'
+    def add(self, chunk):
+        if self._writer is None and self.memory_bytes + chunk.nbytes <= self.memory_cap_bytes:
+            self.chunks.append(chunk)
+            self.memory_bytes += chunk.nbytes
+            self.rows_in_memory += chunk.num_rows
+            return 'memory'
+        if not self.spill:
+            self.stopped = True
+            return 'stopped'
+        if self._writer is None:
+            self.spill_path = os.path.join(self.spill_dir, f"data_stream_{uuid.uuid4().hex}.parquet")
+            schema = self.chunks[0].schema if self.chunks else chunk.schema
+            self._writer = pq.ParquetWriter(self.spill_path, schema)
+        self._writer.write_table(chunk.cast(self._writer.schema))
+        self.rows_spilled += chunk.num_rows
+        return 'spilled'
+
+    # Function to finish the spill file (safe to call more than once)
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    # Function to return the rows kept in memory as one Arrow table
+    def table(self):
+        if not self.chunks:
+            return None
+        return pa.concat_tables(self.chunks, promote_options='permissive')
@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import URL, make_url
+
+logger = logging.getLogger(__name__)
+
+# Database settings live in pages/.env next to the data page
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(main_dir, "pages", ".env"))
+load_dotenv()
+
+# Table shown on the data page
+DATA_TABLE = os.getenv("DATA_TABLE", "dbo.LP2_Telco_churn_first_3000")
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Reopen connections older than this (seconds)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() not in ("0", "false", "no")
+
+
+# Function to build the database URL
+# DATABASE_URL (e.g. sqlite:///churn.db) overrides the SQL Server settings, which is how
+# the page is run against a local stand-in database.
+def database_url():
+    url = os.getenv("DATABASE_URL")
+    if url:
+        return make_url(url)
+
+    driver = os.getenv("DRIVER", "ODBC Driver 17 for SQL Server").strip("{}")
+    connection_string = (
+        f"DRIVER={{{driver}}};SERVER={os.getenv('SERVER')};DATABASE={os.getenv('DATABASE')};"
+        f"UID={os.getenv('USER')};PWD={os.getenv('PASSWORD')};MARS_Connection=yes;MinProtocolVersion=TLSv1.2;"
+    )
+    return URL.create("mssql+pyodbc", query={"odbc_connect": connection_string})
+
+
+class PoolCounters:
+    # Counts of pool events, to show how often connections are opened versus reused
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self._lock = threading.Lock()
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+        logger.info("Opened database connection %d", self.connects)
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+
+# Function to create an engine with the configured pool
+def create_pooled_engine(url=None):
+    url = database_url() if url is None else make_url(url)
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        # In-memory SQLite uses a single-connection pool without these settings
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    engine = create_engine(url, **options)
+    counters = PoolCounters()
+    event.listen(engine, 'connect', counters.on_connect)
+    event.listen(engine, 'checkout', counters.on_checkout)
+    engine.pool_counters = counters
+    return engine
+
+
+# Process-wide engine shared by every session
+_engine = None
+_engine_lock = threading.Lock()
+
+
+# Function to get the shared engine, creating it on first use
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_pooled_engine()
+        return _engine
+
+
+# Function to report pool usage for display on the page
+def pool_status(engine):
+    pool = engine.pool
+    counters = engine.pool_counters
+    status = {
+        'connections_opened': counters.connects,
+        'checkouts': counters.checkouts,
+    }
+    for name in ['size', 'checkedout', 'checkedin', 'overflow']:
+        method = getattr(pool, name, None)
+        if method is not None:
+            status[name] = method()
+    return status
+
+
+# Function to run a query on a pooled connection and return it as a DataFrame
+def read_sql(query, params=None, engine=None):
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        return pd.read_sql(text(query), conn, params=params)
+
+
+# Load dn.csv into a SQLite database and read it from many threads through the pool
+if __name__ == '__main__':
+    import argparse
+    import tempfile
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from utils.datasets import DEFAULT_DATASET_PATH
+
+    parser = argparse.ArgumentParser(description="Exercise the pooled engine against a SQLite copy of dn.csv.")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_pooled_engine(f"sqlite:///{os.path.join(tmp, 'churn.db')}")
+        pd.read_csv(DEFAULT_DATASET_PATH).to_sql('churn', engine, index=False)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as executor:
+            list(executor.map(lambda _: read_sql("SELECT COUNT(*) AS n FROM churn", engine=engine), range(args.queries)))
+        elapsed = time.perf_counter() - start
+
+        print(f"{args.queries} queries from {args.threads} threads in {elapsed:.2f} s")
+        print(pool_status(engine))
+        engine.dispose()
@@ -0,0 +1,239 @@
+import hashlib
+import io
+import json
+import os
+import threading
+
+import pandas as pd
+
+# Default location of the churn dataset used by the dashboard
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATASET_PATH = os.path.join(main_dir, "datasets", "dn.csv")
+
+# Explicit schema of datasets/dn.csv: low-cardinality text columns are categories and
+# the True/False columns are booleans, instead of the object dtypes pandas infers.
+category_columns = [
+    'Gender', 'Internet_Service', 'Online_Security', 'Online_Backup', 'Device_Protection',
+    'Tech_Support', 'Streaming_TV', 'Streaming_Movies', 'Contract', 'Paperless_Billing',
+    'Payment_Method', 'Churn',
+]
+bool_columns = ['Senior_Citizen', 'Partner', 'Dependents', 'Phone_Service', 'Multiple_Lines']
+DN_SCHEMA = {
+    'Customer_ID': 'string',
+    'Tenure_Months': 'int16',
+    'Monthly_Charges': 'float64',
+    'Total_Charges': 'float64',
+    **{col: 'category' for col in category_columns},
+    **{col: 'bool' for col in bool_columns},
+}
+
+
+# Function to compute the content hash of a file
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Function to parse the CSV with the explicit schema (columns not in the file are skipped)
+def read_typed_csv(path, schema=DN_SCHEMA):
+    header = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, dtype={col: dtype for col, dtype in schema.items() if col in header})
+
+
+# Function to concatenate frames and restore the schema's category dtypes
+# (pd.concat falls back to object when the category sets differ)
+def concat_typed(frames, schema=DN_SCHEMA):
+    frame = pd.concat(frames, ignore_index=True)
+    return frame.astype({col: dtype for col, dtype in schema.items() if col in frame.columns and dtype == 'category'})
+
+
+# Function to give an already loaded frame (e.g. rows read from SQL) the schema's dtypes
+# Boolean columns may arrive as 0/1 or "True"/"False" text; integer columns with gaps stay float.
+def apply_schema(frame, schema=DN_SCHEMA):
+    frame = frame.copy()
+    for col, dtype in schema.items():
+        if col not in frame.columns:
+            continue
+        if dtype == 'bool' and frame[col].dtype == object:
+            frame[col] = frame[col].map(lambda value: str(value).strip().lower() in ('true', '1', 'yes'))
+        elif dtype.startswith(('int', 'float')):
+            numeric = pd.to_numeric(frame[col], errors='coerce')
+            frame[col] = numeric if dtype.startswith('int') and numeric.isna().any() else numeric.astype(dtype)
+        else:
+            frame[col] = frame[col].astype(dtype)
+    return frame
+
+
+# Function to get the Parquet sidecar and metadata paths for a CSV (datasets/.dn.csv.parquet)
+def sidecar_paths(path):
+    directory, name = os.path.split(path)
+    sidecar = os.path.join(directory, f".{name}.parquet")
+    return sidecar, sidecar + ".json"
+
+
+# Function to write a file atomically through a temporary file in the same directory
+def write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+class DatasetLoader:
+    # Loads a CSV dataset once per process with typed columns.
+    # The first parse writes a Parquet sidecar next to the CSV; the sidecar is reused
+    # while the source's mtime and size match, or its content hash matches. When rows
+    # are appended to the CSV only the new tail is parsed, and last_append records
+    # (previous version, new rows) so derived caches can update incrementally.
+
+    def __init__(self, path=DEFAULT_DATASET_PATH, schema=DN_SCHEMA):
+        self.path = path
+        self.schema = schema
+        self._lock = threading.Lock()
+        self._frame = None
+        self._signature = None
+        self.version = None
+        self.source = None
+        self.last_append = None
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # Function to save the parsed frame as the Parquet sidecar with its source metadata
+    def _write_sidecar(self, frame, stat, version):
+        sidecar, meta_path = sidecar_paths(self.path)
+        meta = {'source_mtime_ns': stat.st_mtime_ns, 'source_size': stat.st_size, 'source_sha256': version}
+        try:
+            write_atomic(sidecar, lambda tmp: frame.to_parquet(tmp, index=False))
+            write_atomic(meta_path, lambda tmp: write_json(tmp, meta))
+        except OSError:
+            pass  # Read-only deployments still get the typed, cached frame
+
+    # Function to parse only the rows appended since the last load
+    # Returns (frame, version, new_rows), or None if the old content was modified.
+    def _load_appended(self, stat):
+        if self._frame is None or stat.st_size <= self._signature[1]:
+            return None
+        digest = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            remaining = self._signature[1]
+            last_byte = b''
+            while remaining:
+                block = f.read(min(remaining, 1024 * 1024))
+                if not block:
+                    return None
+                digest.update(block)
+                remaining -= len(block)
+                last_byte = block[-1:]
+            if digest.hexdigest() != self.version or last_byte != b'\n':
+                return None
+            tail = f.read()
+        digest.update(tail)
+
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+        columns = pd.read_csv(io.BytesIO(header), nrows=0).columns
+        dtypes = {col: dtype for col, dtype in self.schema.items() if col in columns}
+        new_rows = pd.read_csv(io.BytesIO(header + tail), dtype=dtypes)
+        return concat_typed([self._frame, new_rows], self.schema), digest.hexdigest(), new_rows
+
+    def _load(self, stat):
+        appended = self._load_appended(stat)
+        if appended is not None:
+            frame, version, new_rows = appended
+            self.last_append = (self.version, new_rows)
+            self._write_sidecar(frame, stat, version)
+            return frame, version, 'csv (appended rows)'
+        self.last_append = None
+
+        sidecar, meta_path = sidecar_paths(self.path)
+        meta = self._read_meta(meta_path)
+        if meta is not None and os.path.exists(sidecar):
+            if (meta['source_mtime_ns'], meta['source_size']) == (stat.st_mtime_ns, stat.st_size):
+                return pd.read_parquet(sidecar), meta['source_sha256'], 'parquet'
+            version = file_sha256(self.path)
+            if meta['source_sha256'] == version:
+                # Touched but unchanged: refresh the recorded mtime and keep the sidecar
+                meta.update(source_mtime_ns=stat.st_mtime_ns, source_size=stat.st_size)
+                write_atomic(meta_path, lambda tmp: write_json(tmp, meta))
+                return pd.read_parquet(sidecar), version, 'parquet'
+
+        frame = read_typed_csv(self.path, self.schema)
+        version = file_sha256(self.path)
+        self._write_sidecar(frame, stat, version)
+        return frame, version, 'csv'
+
+    # Function to return the cached frame, re-reading it only when the CSV changes
+    def get(self):
+        stat = os.stat(self.path)  # Raises FileNotFoundError like pd.read_csv did
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._frame is not None and signature == self._signature:
+            return self._frame
+        with self._lock:
+            if self._frame is None or signature != self._signature:
+                self._frame, self.version, self.source = self._load(stat)
+                self._signature = signature
+        return self._frame
+
+
+# Process-wide loaders, one per dataset path
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+# Function to get the shared loader for a dataset path
+def get_dataset_loader(path=DEFAULT_DATASET_PATH):
+    with _loaders_lock:
+        if path not in _loaders:
+            _loaders[path] = DatasetLoader(path)
+        return _loaders[path]
+
+
+# Function to load a dataset through the shared, process-wide cache
+def load_dataset(path=DEFAULT_DATASET_PATH):
+    return get_dataset_loader(path).get()
+
+
+# Compare parse time and memory of the default and typed loads on a synthetic copy of dn.csv
+if __name__ == '__main__':
+    import argparse
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark dataset loading on a synthetic copy of dn.csv.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic_path = os.path.join(tmp, 'dn_synthetic.csv')
+        pd.read_csv(args.dataset).sample(args.rows, replace=True, random_state=0).to_csv(synthetic_path, index=False)
+
+        def measure(label, load):
+            start = time.perf_counter()
+            frame = load()
+            elapsed = time.perf_counter() - start
+            memory_mb = frame.memory_usage(deep=True).sum() / (1024 * 1024)
+            print(f"{label:<28} {elapsed:>8.2f} s {memory_mb:>10.1f} MB")
+
+        print(f"{args.rows:,} rows")
+        measure("pd.read_csv (inferred)", lambda: pd.read_csv(synthetic_path))
+        loader = DatasetLoader(synthetic_path)
+        measure("typed CSV + write sidecar", loader.get)
+        measure("Parquet sidecar", DatasetLoader(synthetic_path).get)
+        measure("process cache", loader.get)
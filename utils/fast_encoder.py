@@ -0,0 +1,255 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.datasets import DEFAULT_DATASET_PATH
+from utils.scoring import dataset_to_expected, expected_columns
+
+# Tolerance for the equivalence check between the two encoders
+ENCODER_RTOL = 1e-9
+ENCODER_ATOL = 1e-9
+
+
+# Function to check that an imputer only fills NaN without adding indicator columns
+def is_nan_imputer(step):
+    return not step.add_indicator and pd.isna(step.missing_values)
+
+
+class NumericBlock:
+    # Numeric columns: optional mean/median/constant imputation followed by affine scaling
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.fill = None
+        self.offset = np.zeros(len(self.columns))
+        self.factor = np.ones(len(self.columns))
+        self.clip = None
+        self.scaled = False
+        self.width = len(self.columns)
+
+    # Function to fold a fitted numeric step into the block's constants
+    def add_step(self, step):
+        name = type(step).__name__
+        if name == 'SimpleImputer' and self.fill is None and not self.scaled and is_nan_imputer(step):
+            self.fill = np.asarray(step.statistics_, dtype=float)
+        elif name == 'FunctionTransformer' and step.func is None:
+            pass  # Fitted form of 'passthrough'
+        elif name == 'StandardScaler':
+            # (x - mean) / scale  ==  x * (1 / scale) - mean / scale
+            mean = step.mean_ if step.mean_ is not None else np.zeros(self.width)
+            scale = step.scale_ if step.scale_ is not None else np.ones(self.width)
+            self.offset = (self.offset - mean) / scale
+            self.factor = self.factor / scale
+            self.scaled = True
+        elif name == 'MinMaxScaler' and self.clip is None:
+            self.offset = self.offset * step.scale_ + step.min_
+            self.factor = self.factor * step.scale_
+            self.scaled = True
+            if step.clip:
+                self.clip = step.feature_range
+        else:
+            raise NotImplementedError(f"Unsupported numeric step: {name}")
+
+    def encode(self, records, out, start):
+        values = np.array([[record[col] for col in self.columns] for record in records], dtype=float)
+        if self.fill is not None:
+            values = np.where(np.isnan(values), self.fill, values)
+        values = values * self.factor + self.offset
+        if self.clip is not None:
+            values = np.clip(values, *self.clip)
+        out[:, start:start + self.width] = values
+
+
+class OneHotBlock:
+    # Categorical columns: optional constant/most-frequent imputation followed by one-hot encoding
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.fill = None
+        self.lookups = None
+        self.width = 0
+
+    def add_step(self, step):
+        name = type(step).__name__
+        if name == 'SimpleImputer' and self.lookups is None and is_nan_imputer(step):
+            self.fill = list(step.statistics_)
+        elif name == 'OneHotEncoder' and self.lookups is None:
+            if getattr(step, '_infrequent_enabled', False) or step.handle_unknown not in ('ignore', 'error'):
+                raise NotImplementedError("Infrequent categories are not supported")
+            self.handle_unknown = step.handle_unknown
+            drop_idx = step.drop_idx_ if step.drop_idx_ is not None else [None] * len(step.categories_)
+            # Precompute category -> output column for every input column
+            self.lookups = []
+            for categories, dropped in zip(step.categories_, drop_idx):
+                lookup = {}
+                for i, category in enumerate(categories):
+                    if dropped is not None and i == dropped:
+                        continue
+                    lookup[category] = self.width
+                    self.width += 1
+                self.lookups.append((lookup, set(categories)))
+        else:
+            raise NotImplementedError(f"Unsupported categorical step: {name}")
+
+    def encode(self, records, out, start):
+        rows = np.arange(len(records))
+        for j, (col, (lookup, known)) in enumerate(zip(self.columns, self.lookups)):
+            values = [record[col] for record in records]
+            if self.fill is not None:
+                # Like SimpleImputer on object columns, only float NaN counts as missing;
+                # None goes on to the encoder as an (unknown) category
+                values = [self.fill[j] if isinstance(value, float) and value != value else value for value in values]
+            if self.handle_unknown == 'error':
+                unknown = [value for value in values if value not in known]
+                if unknown:
+                    raise ValueError(f"Found unknown categories {unknown[:5]} in column {col}")
+            cols = np.array([lookup.get(value, -1) for value in values])
+            hit = cols >= 0
+            out[rows[hit], start + cols[hit]] = 1.0
+
+
+class FastEncoder:
+    # Compiled replacement for a fitted ColumnTransformer.
+    # Turns dicts straight into the model input matrix with precomputed category lookup
+    # tables and scaling constants, without building a DataFrame.
+
+    def __init__(self, preprocessor):
+        transformer = preprocessor
+        if type(transformer).__name__ == 'Pipeline':
+            if len(transformer.steps) != 1:
+                raise NotImplementedError("Only a Pipeline wrapping a single ColumnTransformer is supported")
+            transformer = transformer.steps[0][1]
+        if type(transformer).__name__ != 'ColumnTransformer':
+            raise NotImplementedError(f"Unsupported preprocessor: {type(transformer).__name__}")
+
+        self.sparse_output = bool(getattr(transformer, 'sparse_output_', False))
+        input_names = list(getattr(transformer, 'feature_names_in_', expected_columns.keys()))
+        self.blocks = []
+        for _, step, columns in transformer.transformers_:
+            columns = self._resolve_columns(columns, input_names)
+            if step == 'drop' or not columns:
+                continue
+            if step == 'passthrough':
+                steps = []
+            elif hasattr(step, 'steps'):
+                steps = [s for _, s in step.steps]
+            else:
+                steps = [step]
+            is_categorical = any(type(s).__name__ == 'OneHotEncoder' for s in steps)
+            block = OneHotBlock(columns) if is_categorical else NumericBlock(columns)
+            for s in steps:
+                if s is None or s == 'passthrough':
+                    continue
+                block.add_step(s)
+            if is_categorical and block.lookups is None:
+                raise NotImplementedError("Categorical block without a OneHotEncoder")
+            self.blocks.append(block)
+        self.width = sum(block.width for block in self.blocks)
+
+    @staticmethod
+    def _resolve_columns(columns, input_names):
+        if isinstance(columns, str):
+            return [columns]
+        if isinstance(columns, slice) or callable(columns):
+            raise NotImplementedError("Column slices and selectors are not supported")
+        columns = list(columns)
+        if columns and isinstance(columns[0], (bool, np.bool_)):
+            return [name for name, keep in zip(input_names, columns) if keep]
+        return [input_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+
+    # Function to encode a dict or a list of dicts (merged with the expected defaults)
+    def transform_records(self, records):
+        if isinstance(records, dict):
+            records = [records]
+        records = [{**expected_columns, **record} for record in records]
+        out = np.zeros((len(records), self.width))
+        start = 0
+        for block in self.blocks:
+            block.encode(records, out, start)
+            start += block.width
+        if self.sparse_output:
+            from scipy import sparse
+            return sparse.csr_matrix(out)
+        return out
+
+    # Function to encode a DataFrame in the expected schema
+    def transform(self, df):
+        return self.transform_records(df.to_dict(orient='records'))
+
+
+# Function to compare the compiled encoder with preprocessor.transform on a frame
+# Returns (matches, max_abs_diff).
+def verify_encoder(encoder, preprocessor, frame):
+    expected = preprocessor.transform(frame)
+    actual = encoder.transform(frame)
+    if hasattr(expected, 'toarray'):
+        expected = expected.toarray()
+    if hasattr(actual, 'toarray'):
+        actual = actual.toarray()
+    expected = np.asarray(expected, dtype=float)
+    if expected.shape != actual.shape:
+        return False, float('inf')
+    max_diff = float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+    return bool(np.allclose(expected, actual, rtol=ENCODER_RTOL, atol=ENCODER_ATOL)), max_diff
+
+
+# Function to compile an encoder and check it against datasets/dn.csv
+# Returns (encoder or None, status message); None means the sklearn path must be used.
+def build_fast_encoder(preprocessor, dataset_path=DEFAULT_DATASET_PATH):
+    try:
+        encoder = FastEncoder(preprocessor)
+        frame = dataset_to_expected(pd.read_csv(dataset_path))
+        matches, max_diff = verify_encoder(encoder, preprocessor, frame)
+    except Exception as e:
+        return None, f"sklearn fallback ({e})"
+    if not matches:
+        return None, f"sklearn fallback (max difference {max_diff:.3g} on {os.path.basename(dataset_path)})"
+    return encoder, f"compiled (verified on {len(frame):,} rows, max difference {max_diff:.3g})"
+
+
+# Compiled encoders per model bundle version, shared across sessions
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+# Function to get the verified encoder for the registry's current bundle
+# Returns (encoder or None, status message).
+def get_fast_encoder(registry):
+    version = registry.version
+    with _encoders_lock:
+        if version not in _encoders:
+            preprocessor = registry.get()['preprocessing']['preprocessor']
+            _encoders.clear()
+            _encoders[version] = build_fast_encoder(preprocessor)
+        return _encoders[version]
+
+
+# Check the compiled encoder against preprocessor.transform over datasets/dn.csv
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+
+    from utils.model_registry import load_components
+
+    parser = argparse.ArgumentParser(description="Verify the compiled encoder against the sklearn preprocessor.")
+    parser.add_argument('--bundle', default=None, help="Bundle to load (default: MODEL_BUNDLE_PATH or the current build)")
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH)
+    args = parser.parse_args()
+
+    preprocessor = load_components(args.bundle)['preprocessing']['preprocessor']
+    frame = dataset_to_expected(pd.read_csv(args.dataset))
+    encoder = FastEncoder(preprocessor)
+    matches, max_diff = verify_encoder(encoder, preprocessor, frame)
+    print(f"rows={len(frame)} matches={matches} max_abs_diff={max_diff:.3g}")
+
+    record = frame.iloc[0].to_dict()
+    for label, fn in [("sklearn", lambda: preprocessor.transform(pd.DataFrame([record]))),
+                      ("compiled", lambda: encoder.transform_records(record))]:
+        start = time.perf_counter()
+        for _ in range(200):
+            fn()
+        print(f"{label:>9}: {(time.perf_counter() - start) / 200 * 1e6:.0f} us per record")
+    sys.exit(0 if matches else 1)
@@ -0,0 +1,88 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.lazy_imports import lazy_module
+
+plt = lazy_module('matplotlib.pyplot')  # Imported when the first figure is rendered
+
+# Total size of rendered images kept in memory, and the image format/resolution
+FIGURE_CACHE_MAX_BYTES = int(os.getenv("FIGURE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+FIGURE_FORMAT = os.getenv("FIGURE_FORMAT", "png")
+FIGURE_DPI = 200  # Same resolution st.pyplot uses
+
+
+# Function to build the cache key of a chart from the dataset version, chart id and parameters
+def figure_key(dataset_version, chart_id, params=None):
+    payload = json.dumps([dataset_version, chart_id, params or {}, FIGURE_FORMAT], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Function to rasterize a matplotlib figure to PNG (or SVG) bytes and close it
+def render_figure(fig, fmt=FIGURE_FORMAT):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, bbox_inches='tight', dpi=FIGURE_DPI)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+class FigureCache:
+    # Rendered chart images shared by every session, evicted least recently used
+    # once their total size exceeds max_bytes
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (image bytes, render seconds)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.render_seconds_saved = 0.0
+
+    # Function to return the cached image, or draw and render it on a miss
+    # draw() must return a matplotlib figure; it only runs on a miss.
+    def get_or_render(self, dataset_version, chart_id, draw, params=None):
+        key = figure_key(dataset_version, chart_id, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.render_seconds_saved += entry[1]
+                return entry[0]
+            self.misses += 1
+
+        start = time.perf_counter()
+        image = render_figure(draw())
+        render_seconds = time.perf_counter() - start
+
+        with self._lock:
+            if key not in self._entries and len(image) <= self.max_bytes:
+                self._entries[key] = (image, render_seconds)
+                self.total_bytes += len(image)
+                while self.total_bytes > self.max_bytes:
+                    _, (evicted, _) = self._entries.popitem(last=False)
+                    self.total_bytes -= len(evicted)
+                    self.evictions += 1
+        return image
+
+    # Function to report cache statistics for display on the page
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'megabytes': self.total_bytes / (1024 * 1024),
+                'evictions': self.evictions,
+                'render_seconds_saved': self.render_seconds_saved,
+            }
+
+
+# Process-wide figure cache
+figure_cache = FigureCache()
@@ -0,0 +1,188 @@
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.data_stream import DATA_SPILL_DIR
+
+# Rows serialized per chunk
+EXPORT_CHUNK_ROWS = int(os.getenv("HISTORY_EXPORT_CHUNK_ROWS", "50000"))
+# st.download_button holds the whole file it is given in memory, so exports are split
+# into parts of about this size that are downloaded one at a time
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", str(64 * 1024 * 1024)))
+# Exports are written under DATA_SPILL_DIR/exports; exports older than
+# EXPORT_MAX_AGE_SECONDS are removed, then the oldest ones past EXPORT_DIR_MAX_BYTES
+EXPORT_DIR = os.path.join(DATA_SPILL_DIR, "exports")
+EXPORT_MAX_AGE_SECONDS = int(os.getenv("EXPORT_MAX_AGE_SECONDS", "3600"))
+EXPORT_DIR_MAX_BYTES = int(os.getenv("EXPORT_DIR_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# Arrow schema of the prediction history, matching HISTORY_COLUMNS
+history_schema = pa.schema([
+    ('Date', pa.string()),
+    ('Time', pa.string()),
+    ('Prediction', pa.string()),
+    ('Model', pa.string()),
+    ('Probability', pa.float64()),
+    ('Interpretation', pa.string()),
+])
+
+
+# Function to select the logical rows whose Date/Time fall within [start, end]
+# start and end are datetimes (either may be None); Date/Time are stored as
+# 'YYYY-MM-DD' and 'HH:MM:SS' strings, which compare correctly as text.
+def select_rows(store, start=None, end=None):
+    dates = store.column('Date').astype(str)
+    times = store.column('Time').astype(str)
+    mask = np.ones(len(store), dtype=bool)
+    if start is not None:
+        start_date, start_time = start.strftime('%Y-%m-%d'), start.strftime('%H:%M:%S')
+        mask &= (dates > start_date) | ((dates == start_date) & (times >= start_time))
+    if end is not None:
+        end_date, end_time = end.strftime('%Y-%m-%d'), end.strftime('%H:%M:%S')
+        mask &= (dates < end_date) | ((dates == end_date) & (times <= end_time))
+    return np.flatnonzero(mask)
+
+
+# Function to yield the selected rows as DataFrames of at most chunk_rows rows
+def iter_frames(store, rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, len(rows), chunk_rows):
+        yield store.take(rows[start:start + chunk_rows])
+
+
+# Function to remove old exports: those past max_age_seconds, then the oldest ones until
+# the directory fits in max_bytes. Returns the number of exports removed.
+def prune_exports(directory=EXPORT_DIR, max_age_seconds=EXPORT_MAX_AGE_SECONDS, max_bytes=EXPORT_DIR_MAX_BYTES):
+    exports = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir():
+                    try:
+                        files = [os.path.join(entry.path, name) for name in os.listdir(entry.path)]
+                        size = sum(os.path.getsize(path) for path in files)
+                        exports.append((entry.stat().st_mtime, size, entry.path))
+                    except OSError:
+                        continue
+    except OSError:
+        return 0
+    exports.sort()  # Oldest first
+    total = sum(size for _, size, _ in exports)
+    now = time.time()
+    removed = 0
+    for created_at, size, path in exports:
+        if total <= max_bytes and now - created_at <= max_age_seconds:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+class ExportParts:
+    # An export written to disk as one or more part files of about max_bytes each. Every
+    # part can be used on its own (CSV parts repeat the header, Parquet parts are complete
+    # files), so a page hands st.download_button one part at a time instead of the whole
+    # export. The files live in their own directory under EXPORT_DIR until remove() or
+    # prune_exports() deletes them.
+
+    def __init__(self, file_name, directory=EXPORT_DIR, max_bytes=DOWNLOAD_MAX_BYTES):
+        prune_exports(directory)
+        self.stem, self.extension = os.path.splitext(file_name)
+        self.directory = os.path.join(directory, uuid.uuid4().hex)
+        self.max_bytes = max_bytes
+        self.paths = []
+        os.makedirs(self.directory)
+
+    # Function to add a part file and return its path
+    def new_part(self):
+        self.paths.append(os.path.join(self.directory, f"part{len(self.paths) + 1:04d}{self.extension}"))
+        return self.paths[-1]
+
+    # Function to check that the part files are still on disk (not pruned)
+    def available(self):
+        return all(os.path.exists(path) for path in self.paths)
+
+    # Function to name a part for the download
+    def file_name(self, index):
+        if len(self.paths) == 1:
+            return f"{self.stem}{self.extension}"
+        return f"{self.stem}_part{index + 1}_of_{len(self.paths)}{self.extension}"
+
+    # Function to read one part for st.download_button
+    def read(self, index):
+        with open(self.paths[index], 'rb') as f:
+            return f.read()
+
+    # Function to get the total size of the parts in bytes
+    def size(self):
+        return sum(os.path.getsize(path) for path in self.paths)
+
+    # Function to delete the export's files
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# Function to write DataFrames as CSV parts; a new part starts, with the header, when the
+# next chunk would take the current part past max_bytes
+def write_csv_parts(frames, columns, parts):
+    header = (','.join(columns) + '\n').encode('utf-8')
+    f = None
+    try:
+        for frame in frames:
+            body = frame.to_csv(index=False, header=False).encode('utf-8')
+            if f is None or (f.tell() > len(header) and f.tell() + len(body) > parts.max_bytes):
+                if f is not None:
+                    f.close()
+                f = open(parts.new_part(), 'wb')
+                f.write(header)
+            f.write(body)
+        if f is None:
+            f = open(parts.new_part(), 'wb')
+            f.write(header)
+    finally:
+        if f is not None:
+            f.close()
+    return parts
+
+
+# Function to write the selected rows as CSV parts, one chunk at a time
+def export_csv(store, rows, file_name, chunk_rows=EXPORT_CHUNK_ROWS):
+    return write_csv_parts(iter_frames(store, rows, chunk_rows), store.columns, ExportParts(file_name))
+
+
+# Function to write a DataFrame as CSV parts, chunk_rows rows at a time
+def export_frame_csv(frame, file_name, chunk_rows=EXPORT_CHUNK_ROWS):
+    chunks = (frame.iloc[start:start + chunk_rows] for start in range(0, len(frame), chunk_rows))
+    return write_csv_parts(chunks, [str(col) for col in frame.columns], ExportParts(file_name))
+
+
+# Function to write the selected rows as Parquet parts, one row group per chunk
+# A new part starts when another row group the size of the last one would not fit.
+def export_parquet(store, rows, file_name, chunk_rows=EXPORT_CHUNK_ROWS):
+    parts = ExportParts(file_name)
+    sink, writer, last_group = None, None, 0
+    try:
+        for frame in iter_frames(store, rows, chunk_rows):
+            if writer is None or sink.tell() + last_group > parts.max_bytes:
+                if writer is not None:
+                    writer.close()
+                    sink.close()
+                sink = open(parts.new_part(), 'wb')
+                writer = pq.ParquetWriter(sink, history_schema, compression='zstd')
+            frame = frame.astype({'Probability': 'float64'})
+            before = sink.tell()
+            writer.write_table(pa.Table.from_pandas(frame, schema=history_schema, preserve_index=False))
+            last_group = sink.tell() - before
+        if writer is None:
+            sink = open(parts.new_part(), 'wb')
+            writer = pq.ParquetWriter(sink, history_schema, compression='zstd')
+    finally:
+        if writer is not None:
+            writer.close()
+        if sink is not None:
+            sink.close()
+    return parts
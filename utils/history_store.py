@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columns of the prediction history and their storage dtypes
+HISTORY_COLUMNS = {
+    'Date': object,
+    'Time': object,
+    'Prediction': object,
+    'Model': object,
+    'Probability': np.float64,
+    'Interpretation': object,
+}
+
+# Most rows kept per session; the oldest rows are dropped beyond this
+HISTORY_MAX_ROWS = int(os.getenv("HISTORY_MAX_ROWS", "200000"))
+
+
+class HistoryStore:
+    # Preallocated columnar store for the session's prediction history.
+    # Capacity doubles until max_rows (amortized O(1) appends); once full it behaves
+    # as a ring buffer that overwrites the oldest rows.
+
+    def __init__(self, columns=HISTORY_COLUMNS, max_rows=HISTORY_MAX_ROWS, initial_capacity=64):
+        self.columns = dict(columns)
+        self.max_rows = max_rows
+        self._capacity = min(initial_capacity, max_rows)
+        self._data = {col: np.empty(self._capacity, dtype=dtype) for col, dtype in self.columns.items()}
+        self._start = 0  # Physical index of the oldest row
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    # Function to grow the arrays (only happens before the ring buffer wraps)
+    def _reserve(self, rows):
+        if rows <= self._capacity or self._capacity >= self.max_rows:
+            return
+        capacity = self._capacity
+        while capacity < rows:
+            capacity *= 2
+        capacity = min(capacity, self.max_rows)
+        order = self._physical(0, self._size)
+        for col, dtype in self.columns.items():
+            grown = np.empty(capacity, dtype=dtype)
+            grown[:self._size] = self._data[col][order]
+            self._data[col] = grown
+        self._capacity = capacity
+        self._start = 0
+
+    # Function to map logical row numbers (0 = oldest) to positions in the arrays
+    def _physical(self, start, stop):
+        return (self._start + np.arange(start, stop)) % self._capacity
+
+    # Function to append one prediction record (a dict keyed by column name)
+    def append(self, record):
+        self.extend({col: [record.get(col)] for col in self.columns})
+
+    # Function to append many rows at once from a DataFrame or a dict of equal-length columns
+    def extend(self, rows):
+        if isinstance(rows, pd.DataFrame):
+            rows = {col: rows[col].to_numpy() for col in self.columns if col in rows.columns}
+        n = len(next(iter(rows.values()))) if rows else 0
+        if n == 0:
+            return
+        if n > self.max_rows:
+            rows = {col: values[-self.max_rows:] for col, values in rows.items()}
+            n = self.max_rows
+
+        self._reserve(self._size + n)
+        positions = (self._start + self._size + np.arange(n)) % self._capacity
+        for col in self.columns:
+            self._data[col][positions] = rows.get(col, [None] * n)
+
+        overflow = max(0, self._size + n - self._capacity)
+        self._start = (self._start + overflow) % self._capacity
+        self._size = min(self._size + n, self._capacity)
+
+    # Function to materialize logical rows [start, stop) as a DataFrame
+    def to_frame(self, start=0, stop=None):
+        stop = self._size if stop is None else min(stop, self._size)
+        start = max(0, min(start, stop))
+        positions = self._physical(start, stop)
+        frame = pd.DataFrame({col: self._data[col][positions] for col in self.columns})
+        frame.index = pd.RangeIndex(start, stop)
+        return frame
+
+    # Function to materialize arbitrary logical rows (e.g. the result of a filter)
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        positions = (self._start + rows) % self._capacity
+        frame = pd.DataFrame({col: self._data[col][positions] for col in self.columns})
+        frame.index = pd.Index(rows)
+        return frame
+
+    # Function to return one column in logical order without building a DataFrame
+    def column(self, name):
+        return self._data[name][self._physical(0, self._size)]
+
+    # Function to return one page of rows; page numbers start at 1
+    def page(self, page_number, page_size):
+        start = (page_number - 1) * page_size
+        return self.to_frame(start, start + page_size)
+
+    # Function to return the most recent rows
+    def tail(self, n):
+        return self.to_frame(max(0, self._size - n))
+
+    def page_count(self, page_size):
+        return max(1, -(-self._size // page_size))
@@ -0,0 +1,28 @@
+import importlib
+import importlib.util
+
+
+class LazyModule:
+    # Stands in for a module and imports it the first time one of its attributes is used.
+    # Pages keep writing plt.subplots(...) or requests.post(...), but only the code paths
+    # that draw or call out pay for importing the library.
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        # After the first call this is a lookup in sys.modules
+        return getattr(importlib.import_module(self._name), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'>"
+
+
+# Function to get a module that is imported on first use
+def lazy_module(name):
+    return LazyModule(name)
+
+
+# Function to check whether a module could be imported, without importing it
+def module_available(name):
+    return importlib.util.find_spec(name) is not None
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import time
+
+import joblib
+
+from utils.datasets import file_sha256, write_atomic, write_json
+
+# On-disk layout of a built bundle:
+#   models/bundles/current.json         -> {"bundle": "<version[:12]>"}
+#   models/bundles/<version[:12]>/manifest.json
+#   models/bundles/<version[:12]>/<component>.joblib
+# Components whose pickle is at least MMAP_MIN_BYTES (the models holding large numpy
+# arrays) are stored uncompressed so joblib can memory map their arrays; smaller ones
+# are compressed.
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+CURRENT_POINTER = 'current.json'
+MMAP_MIN_BYTES = 1024 * 1024
+COMPRESSION = 3
+SMOKE_TEST_RUNS = 20
+
+
+# Function to list the components of a bundle as (file name, key path, object)
+def component_entries(components):
+    entries = [('preprocessor', ['preprocessing', 'preprocessor'], components['preprocessing']['preprocessor'])]
+    for name, model in components['tuned_models'].items():
+        entries.append((f"model_{name}", ['tuned_models', name], model))
+    return entries
+
+
+# Function to write one component, compressed only if it is small
+# Returns True if the file was compressed.
+def dump_component(obj, path):
+    joblib.dump(obj, path)
+    if os.path.getsize(path) >= MMAP_MIN_BYTES:
+        return False
+    joblib.dump(obj, path, compress=COMPRESSION)
+    return True
+
+
+# Function to find the manifest of a bundle path
+# path may be a bundle directory, the bundles directory holding current.json, or a
+# manifest file. Returns None for anything else (e.g. a single joblib .pkl bundle).
+def resolve_manifest(path):
+    if os.path.isdir(path):
+        if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+            return os.path.join(path, MANIFEST_NAME)
+        pointer = os.path.join(path, CURRENT_POINTER)
+        if os.path.exists(pointer):
+            with open(pointer, 'r') as f:
+                return os.path.join(path, json.load(f)['bundle'], MANIFEST_NAME)
+        raise FileNotFoundError(f"No bundle in {path}: build one with `python -m models.create_model_components`")
+    if os.path.basename(path) == MANIFEST_NAME:
+        return path
+    return None
+
+
+# Function to return the file whose size and modification time reveal a new bundle
+def watched_file(path):
+    if os.path.isdir(path):
+        manifest = os.path.join(path, MANIFEST_NAME)
+        return manifest if os.path.exists(manifest) else os.path.join(path, CURRENT_POINTER)
+    return path
+
+
+# Function to read a bundle manifest
+def read_manifest(manifest_path):
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+# Function to load the components listed in a manifest, verifying each file's checksum
+def load_bundle(manifest_path, mmap_mode=None, verify=True):
+    manifest = read_manifest(manifest_path)
+    directory = os.path.dirname(manifest_path)
+    components = {}
+    for entry in manifest['components']:
+        path = os.path.join(directory, entry['file'])
+        if verify and file_sha256(path) != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for {entry['file']} in bundle {manifest['version'][:12]}")
+        # joblib ignores mmap_mode for compressed files, so only pass it for the large ones
+        obj = joblib.load(path, mmap_mode=None if entry['compressed'] else mmap_mode)
+        target = components
+        for key in entry['key'][:-1]:
+            target = target.setdefault(key, {})
+        target[entry['key'][-1]] = obj
+    return components, manifest
+
+
+# Function to time a callable, returning the median milliseconds over several runs
+def median_ms(fn, runs=SMOKE_TEST_RUNS):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+# Function to write a versioned, checksummed bundle and point current.json at it
+# smoke_frame holds a few customer rows in the model input schema; every model is
+# smoke-tested on its first row after the bundle is loaded back from disk.
+def write_bundle(components, output_dir, smoke_frame, metadata=None, mmap_mode='c'):
+    os.makedirs(output_dir, exist_ok=True)
+    staging = os.path.join(output_dir, f".building-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    entries = []
+    for file_stem, key, obj in component_entries(components):
+        file_name = f"{file_stem}.joblib"
+        path = os.path.join(staging, file_name)
+        compressed = dump_component(obj, path)
+        entries.append({
+            'name': file_stem,
+            'key': key,
+            'file': file_name,
+            'compressed': compressed,
+            'bytes': os.path.getsize(path),
+            'sha256': file_sha256(path),
+        })
+
+    # The bundle version depends only on the component files
+    digest = hashlib.sha256()
+    for entry in sorted(entries, key=lambda e: e['file']):
+        digest.update(f"{entry['file']}:{entry['sha256']}\n".encode())
+    version = digest.hexdigest()
+
+    # Load every component back the way the registry will and record its cost
+    loaded = {}
+    for entry in entries:
+        path = os.path.join(staging, entry['file'])
+        start = time.perf_counter()
+        loaded[entry['name']] = joblib.load(path, mmap_mode=None if entry['compressed'] else mmap_mode)
+        entry['load_seconds'] = round(time.perf_counter() - start, 6)
+
+    preprocessor = loaded['preprocessor']
+    sample = smoke_frame.head(1)
+    features = preprocessor.transform(sample)
+    for entry in entries:
+        if entry['name'] == 'preprocessor':
+            entry['smoke_test_ms'] = round(median_ms(lambda: preprocessor.transform(sample)), 4)
+        else:
+            model = loaded[entry['name']]
+            entry['smoke_test_ms'] = round(median_ms(lambda: model.predict_proba(features)), 4)
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        **(metadata or {}),
+        'components': entries,
+    }
+    write_json(os.path.join(staging, MANIFEST_NAME), manifest)
+
+    bundle_dir = os.path.join(output_dir, version[:12])
+    if os.path.exists(bundle_dir):
+        shutil.rmtree(staging)  # Same content was built before; keep the existing files
+    else:
+        os.replace(staging, bundle_dir)
+    write_atomic(os.path.join(output_dir, CURRENT_POINTER), lambda tmp: write_json(tmp, {'bundle': version[:12]}))
+    return read_manifest(os.path.join(bundle_dir, MANIFEST_NAME)), bundle_dir
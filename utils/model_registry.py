@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+
+import joblib
+
+from utils.datasets import file_sha256
+from utils.model_bundle import CURRENT_POINTER, load_bundle, read_manifest, resolve_manifest, watched_file
+
+# Bundles built by `python -m models.create_model_components` go to models/bundles; the
+# single-file models/churn_model_components.pkl is used until one has been built
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLES_DIR = os.path.join(main_dir, "models", "bundles")
+LEGACY_BUNDLE_PATH = os.path.join(main_dir, "models", "churn_model_components.pkl")
+
+# Numpy arrays in uncompressed bundles are memory mapped copy-on-write, so every
+# worker process maps the same pages instead of holding its own copy. Read-only maps
+# ('r') break libsvm, which needs writable buffers for the SVM support vectors.
+MMAP_MODE = 'c'
+
+
+# Function to find the bundle to load: MODEL_BUNDLE_PATH if set, else models/bundles once
+# a bundle has been built there, else the single-file bundle
+# Read on every call, so the environment and a new build are picked up without a re-import.
+def default_bundle_path():
+    path = os.getenv("MODEL_BUNDLE_PATH")
+    if path:
+        return path
+    return BUNDLES_DIR if os.path.exists(os.path.join(BUNDLES_DIR, CURRENT_POINTER)) else LEGACY_BUNDLE_PATH
+
+
+# Function to read the resident memory of this process in MB (None if psutil is missing)
+def resident_memory_mb():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+
+class ModelRegistry:
+    # Loads the model components once per process and shares them across sessions.
+    # path is a built bundle (its directory, or models/bundles to follow current.json) or
+    # a single joblib file. The bundle is only reloaded when its version changes: the
+    # manifest's version for built bundles, the content hash for a single file. Nothing
+    # is re-read until the size or modification time of the manifest, pointer or file changes.
+    # Without a path, default_bundle_path() is used.
+
+    def __init__(self, path=None):
+        self.path = path or default_bundle_path()
+        self._lock = threading.Lock()
+        self._components = None
+        self._version = None
+        self._stat = None
+        self.load_count = 0
+        self.last_load_seconds = None
+        self.last_loaded_at = None
+
+    # Function to return the components, loading or reloading them if needed
+    def get(self):
+        stat = os.stat(watched_file(self.path))  # Raises FileNotFoundError like joblib.load did
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._components is not None and signature == self._stat:
+            return self._components
+
+        with self._lock:
+            if self._components is not None and signature == self._stat:
+                return self._components
+            manifest_path = resolve_manifest(self.path)
+            version = file_sha256(self.path) if manifest_path is None else read_manifest(manifest_path)['version']
+            if self._components is None or version != self._version:
+                start = time.perf_counter()
+                if manifest_path is None:
+                    # joblib ignores mmap_mode (with a warning) for compressed bundles
+                    components = joblib.load(self.path, mmap_mode=MMAP_MODE)
+                else:
+                    # Checksums are verified; only the uncompressed components are memory mapped
+                    components, _ = load_bundle(manifest_path, mmap_mode=MMAP_MODE)
+                self.last_load_seconds = time.perf_counter() - start
+                self.last_loaded_at = time.time()
+                self.load_count += 1
+                self._components = components
+                self._version = version
+            self._stat = signature
+        return self._components
+
+    # Function to return the version of the currently loaded bundle
+    @property
+    def version(self):
+        self.get()
+        return self._version
+
+    # Function to report load statistics for display on the page
+    def stats(self):
+        return {
+            'version': self._version[:12] if self._version else None,
+            'load_count': self.load_count,
+            'last_load_seconds': self.last_load_seconds,
+            'resident_memory_mb': resident_memory_mb(),
+        }
+
+
+# Process-wide registries, one per bundle path
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+# Function to get the shared registry for a bundle path (default_bundle_path() if None)
+def get_registry(path=None):
+    path = path or default_bundle_path()
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = ModelRegistry(path)
+        return _registries[path]
+
+
+# Function to get the shared model components for a bundle path
+def load_components(path=None):
+    return get_registry(path).get()
+
+
+# Simulate concurrent sessions asking for the components and report load time and memory
+if __name__ == '__main__':
+    import argparse
+    from concurrent.futures import ThreadPoolExecutor
+
+    parser = argparse.ArgumentParser(description="Check that model loading stays flat as sessions increase.")
+    parser.add_argument('--path', default=None, help="Bundle to load (default: MODEL_BUNDLE_PATH or the current build)")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+
+    registry = get_registry(args.path)
+    print(f"{'sessions':>8} {'seconds':>10} {'loads':>6} {'rss_mb':>10}")
+    for sessions in args.sessions:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(sessions, 32)) as pool:
+            list(pool.map(lambda _: registry.get(), range(sessions)))
+        elapsed = time.perf_counter() - start
+        stats = registry.stats()
+        rss = stats['resident_memory_mb']
+        print(f"{sessions:>8} {elapsed:>10.4f} {stats['load_count']:>6} {rss if rss is None else round(rss, 1):>10}")
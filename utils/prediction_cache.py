@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.scoring import expected_columns
+
+# Size and lifetime of the process-wide prediction cache
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+
+numeric_columns = [col for col, default in expected_columns.items() if isinstance(default, (int, float))]
+
+
+# Function to build a canonical hash of a customer record, model name and bundle version
+# The record is merged with the defaults and numeric fields are cast to float, so
+# {'tenure': 1} and {'tenure': 1.0} share an entry.
+def prediction_key(attributes, model_name, bundle_version):
+    record = {**expected_columns, **attributes}
+    for col in numeric_columns:
+        record[col] = float(record[col])
+    payload = json.dumps([record, model_name, bundle_version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PredictionCache:
+    # Bounded LRU cache with a time-to-live, cleared whenever the model bundle changes
+
+    def __init__(self, max_entries=PREDICTION_CACHE_MAX_ENTRIES, ttl_seconds=PREDICTION_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bundle_version = None
+        self.hits = 0
+        self.misses = 0
+
+    # Function to drop every entry when the bundle version differs from the cached one
+    def ensure_version(self, bundle_version):
+        with self._lock:
+            if bundle_version != self._bundle_version:
+                self._entries.clear()
+                self._bundle_version = bundle_version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Function to return the cached prediction or compute and store it
+    def get_or_compute(self, attributes, model_name, bundle_version, compute):
+        self.ensure_version(bundle_version)
+        key = prediction_key(attributes, model_name, bundle_version)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    # Function to report hit/miss counters for display on the page
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+            }
+
+
+# Process-wide cache shared by every session
+prediction_cache = PredictionCache()
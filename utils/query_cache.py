@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+from utils.datasets import write_atomic, write_json
+
+# Where cached query results are stored, and how long they are served without a probe
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR", os.path.join(main_dir, ".query_cache"))
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+# Bounds on the cache directory: least recently used results are removed once the
+# Parquet files exceed QUERY_CACHE_MAX_BYTES, and any result unused for
+# QUERY_CACHE_MAX_IDLE_SECONDS is removed regardless of size
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+QUERY_CACHE_MAX_IDLE_SECONDS = int(os.getenv("QUERY_CACHE_MAX_IDLE_SECONDS", str(24 * 3600)))
+
+
+# Function to normalize a statement's SQL text so formatting differences share an entry
+def normalize_sql(sql):
+    return re.sub(r"\s+", " ", str(sql)).strip()
+
+
+# Function to describe the database an engine connects to, without its password
+def database_id(engine):
+    return engine.url.render_as_string(hide_password=True)
+
+
+# Function to build the cache key of a query from the database, its normalized SQL and parameters
+# (the same SQL against two databases must not share an entry)
+def query_key(sql, params=None, database=None):
+    payload = json.dumps([database, normalize_sql(sql), params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class QueryCache:
+    # Query results stored as Parquet files on local disk.
+    # An entry younger than the TTL is served as is. An older entry is revalidated with a
+    # probe of the table (row count, max key, checksum where available): if the probe still
+    # matches, the entry is kept for another TTL instead of re-running the query. A table's
+    # probe is run at most once per TTL and shared by every miss and revalidation on it,
+    # since on SQL Server the checksum reads the whole table.
+    # Serving an entry touches its file, and every new entry prunes the directory back to
+    # max_bytes by removing the least recently used ones.
+
+    def __init__(self, directory=QUERY_CACHE_DIR, ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+                 max_bytes=QUERY_CACHE_MAX_BYTES, max_idle_seconds=QUERY_CACHE_MAX_IDLE_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_idle_seconds = max_idle_seconds
+        self._lock = threading.Lock()
+        self._fingerprints = {}  # (database, table) -> (taken_at, fingerprint)
+        self.probes = 0
+        self.counts = {'hit': 0, 'revalidated': 0, 'miss': 0}
+        self.seconds = {'hit': 0.0, 'revalidated': 0.0, 'miss': 0.0}
+
+    def _paths(self, key):
+        return os.path.join(self.directory, f"{key}.parquet"), os.path.join(self.directory, f"{key}.json")
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _record(self, status, seconds):
+        with self._lock:
+            self.counts[status] += 1
+            self.seconds[status] += seconds
+
+    # Function to remove idle entries, then the least recently used ones over max_bytes
+    # Returns the number of entries removed.
+    def prune(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.parquet'):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.name[:-len('.parquet')]))
+        except OSError:
+            return 0
+        entries.sort()  # Least recently used first
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        removed = 0
+        for used_at, size, key in entries:
+            if total <= self.max_bytes and now - used_at <= self.max_idle_seconds:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+    # Function to return the table's fingerprint and when it was taken, reusing one taken
+    # within the TTL; without a table name every call runs probe()
+    def _fingerprint(self, probe, database, table):
+        key = (database, table)
+        with self._lock:
+            taken_at, fingerprint = self._fingerprints.get(key, (0.0, None))
+        if table is not None and time.time() - taken_at < self.ttl_seconds:
+            return fingerprint, taken_at
+        taken_at = time.time()
+        fingerprint = json.loads(json.dumps(probe(), default=str))
+        with self._lock:
+            self.probes += 1
+            if table is not None:
+                self._fingerprints[key] = (taken_at, fingerprint)
+        return fingerprint, taken_at
+
+    # Function to return a query's result from the cache or by running fetch()
+    # probe() returns a small JSON-serializable fingerprint of the table, database
+    # identifies the engine (see database_id) and table names the table probe() reads, so
+    # its fingerprint can be shared. Returns (frame, status) where status is 'hit',
+    # 'revalidated' or 'miss'.
+    def get_or_fetch(self, sql, params, fetch, probe, database=None, table=None):
+        start = time.perf_counter()
+        key = query_key(sql, params, database)
+        data_path, meta_path = self._paths(key)
+        meta = self._read_meta(meta_path)
+
+        status = 'miss'
+        if meta is not None and os.path.exists(data_path):
+            if time.time() - meta['created_at'] < self.ttl_seconds:
+                status = 'hit'
+            else:
+                # A shared fingerprint is younger than the TTL, so it was taken after this
+                # entry was stored and a match still means the entry is at most a TTL old
+                fingerprint, taken_at = self._fingerprint(probe, database, table)
+                if fingerprint == meta['probe']:
+                    meta['created_at'] = taken_at
+                    write_atomic(meta_path, lambda tmp: write_json(tmp, meta))
+                    status = 'revalidated'
+        if status != 'miss':
+            try:
+                frame = pd.read_parquet(data_path)
+                os.utime(data_path)  # Mark as recently used for pruning
+            except OSError:
+                status = 'miss'  # Removed by another process in between
+
+        if status == 'miss':
+            # Taken before fetch(), so a change in between makes the next revalidation refetch
+            fingerprint, _ = self._fingerprint(probe, database, table)
+            frame = fetch()
+            meta = {'created_at': time.time(), 'probe': fingerprint, 'sql': normalize_sql(sql)}
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                write_atomic(data_path, lambda tmp: frame.to_parquet(tmp, index=False))
+                write_atomic(meta_path, lambda tmp: write_json(tmp, meta))
+                self.prune()
+            except (OSError, ValueError):
+                pass  # Results that cannot be stored are simply not cached
+
+        self._record(status, time.perf_counter() - start)
+        return frame, status
+
+    # Function to report the hit rate and mean latency per outcome
+    def stats(self):
+        with self._lock:
+            total = sum(self.counts.values())
+            served = self.counts['hit'] + self.counts['revalidated']
+            stats = {
+                'requests': total,
+                'hit_rate': served / total if total else 0.0,
+                'probes': self.probes,
+            }
+            for status, count in self.counts.items():
+                stats[status] = count
+                stats[f'{status}_ms'] = self.seconds[status] / count * 1000 if count else None
+            return stats
+
+
+# Process-wide query cache
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+# Function to get the shared query cache
+def get_query_cache():
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryCache()
+        return _query_cache
@@ -0,0 +1,184 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Define the expected columns and their default values
+expected_columns = {
+    'Gender': 'Male', 'Senior_Citizen': 'No', 'Partner': 'No', 'Dependents': 'No',
+    'tenure': 0, 'Phone_Service': 'No', 'Multiple_Lines': 'No phone service',
+    'Internet_Service': 'DSL', 'Online_Security': 'No internet service',
+    'Online_Backup': 'No internet service', 'Device_Protection': 'No internet service',
+    'Tech_Support': 'No internet service', 'Streaming_TV': 'No internet service',
+    'Streaming_Movies': 'No internet service', 'Contract': 'Month-to-month',
+    'Paperless_Billing': 'No', 'Payment_Method': 'Electronic check',
+    'Monthly_Charges': 0.0, 'Total_Charges': 0.0
+}
+
+# Number of rows pushed through the preprocessor and model at once in bulk mode
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+# Value spellings in datasets/dn.csv that differ from the prediction form
+dataset_value_map = {
+    True: 'Yes', False: 'No', 'True': 'Yes', 'False': 'No',
+    'No Internet': 'No internet service', 'No internet': 'No internet service',
+}
+
+
+# Function to convert rows of datasets/dn.csv (or the SQL churn table) to the expected schema
+def dataset_to_expected(df):
+    mapped = df.rename(columns={'Tenure_Months': 'tenure'})
+    for col, default in expected_columns.items():
+        if col in mapped.columns and isinstance(default, str):
+            mapped[col] = mapped[col].map(lambda value: dataset_value_map.get(value, value)).astype(object)
+    if 'Multiple_Lines' in mapped.columns and 'Phone_Service' in mapped.columns:
+        mapped.loc[mapped['Phone_Service'] == 'No', 'Multiple_Lines'] = 'No phone service'
+    aligned, _ = align_to_schema(mapped)
+    return aligned
+
+
+# Function to turn customer records into the model input matrix
+# Uses the compiled encoder (utils.fast_encoder) when given and falls back to the
+# sklearn preprocessor if it cannot encode the records.
+def transform_records(records, preprocessor, encoder=None):
+    if encoder is not None:
+        try:
+            return encoder.transform_records(records)
+        except Exception:
+            pass
+    df = pd.DataFrame([{**expected_columns, **record} for record in records], columns=expected_columns.keys())
+    return preprocessor.transform(df)
+
+
+# Function to score a single customer record
+# The record is merged with the defaults from expected_columns before scoring.
+def predict_record(attributes, preprocessor, model, encoder=None):
+    processed_df = transform_records([attributes], preprocessor, encoder)
+    labels, label_prob = proba_labels(model, model.predict_proba(processed_df))
+    return labels[0], label_prob[0]
+
+
+# Function to score several customer records with one transform and one predict_proba
+# Returns a list of (prediction, probability) pairs in the same order as the records.
+def predict_records(records, preprocessor, model, encoder=None):
+    processed = transform_records(records, preprocessor, encoder)
+    labels, label_prob = proba_labels(model, model.predict_proba(processed))
+    return list(zip(labels.tolist(), label_prob.tolist()))
+
+
+# Function to score one record with every model after a single preprocessing pass
+# Each model runs predict_proba once in a thread pool; labels come from the churn
+# probability and the threshold. Returns the per-model results, the averaged ensemble
+# probability and the preprocessing time in milliseconds.
+def compare_models(attributes, preprocessor, models, threshold=0.5, max_workers=None, encoder=None):
+    start = time.perf_counter()
+    processed = transform_records([attributes], preprocessor, encoder)
+    transform_ms = (time.perf_counter() - start) * 1000
+
+    def score(model_name):
+        model = models[model_name]
+        model_start = time.perf_counter()
+        churn_prob = float(model.predict_proba(processed)[0, churn_class_index(model)])
+        return model_name, churn_prob, (time.perf_counter() - model_start) * 1000
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(models)) as pool:
+        scores = list(pool.map(score, models))
+
+    results = pd.DataFrame(scores, columns=['Model', 'Churn_Probability', 'Inference_ms'])
+    results.insert(1, 'Prediction', np.where(results['Churn_Probability'] >= threshold, 'Churn', 'No Churn'))
+    ensemble_prob = float(results['Churn_Probability'].mean())
+    return results, ensemble_prob, transform_ms
+
+
+# Function to read an uploaded CSV or Parquet file into a DataFrame
+def read_customer_file(uploaded_file):
+    name = getattr(uploaded_file, 'name', str(uploaded_file)).lower()
+    if name.endswith('.parquet') or name.endswith('.pq'):
+        return pd.read_parquet(uploaded_file)
+    return pd.read_csv(uploaded_file)
+
+
+# Function to align a customer frame with the expected schema
+# Missing columns are filled with the defaults from expected_columns; returns the
+# aligned frame and the list of columns that had to be filled in.
+def align_to_schema(df):
+    missing = [col for col in expected_columns if col not in df.columns]
+    aligned = df.reindex(columns=list(expected_columns.keys()))
+    for col in missing:
+        aligned[col] = expected_columns[col]
+    numeric_cols = ['tenure', 'Monthly_Charges', 'Total_Charges']
+    for col in numeric_cols:
+        aligned[col] = pd.to_numeric(aligned[col], errors='coerce').fillna(expected_columns[col])
+    return aligned, missing
+
+
+# Function to find the predict_proba column of the churn class (1), defaulting to the last class
+def churn_class_index(model):
+    classes = np.asarray(model.classes_)
+    return int(np.flatnonzero(classes == 1)[0]) if (classes == 1).any() else len(classes) - 1
+
+
+# Function to turn predict_proba output into labels and the probability of each label
+# The label is the churn class when its probability reaches the threshold, as in
+# compare_models, rather than model.predict: SVC's predict ignores its Platt-scaled
+# probabilities and can disagree with them.
+def proba_labels(model, prob, threshold=0.5):
+    classes = np.asarray(model.classes_)
+    churn_idx = churn_class_index(model)
+    churn_prob = prob[:, churn_idx]
+    others = prob.copy()
+    others[:, churn_idx] = -1
+    other_idx = others.argmax(axis=1)
+    is_churn = churn_prob >= threshold
+    labels = np.where(is_churn, classes[churn_idx], classes[other_idx])
+    label_prob = np.where(is_churn, churn_prob, prob[np.arange(len(prob)), other_idx])
+    return labels, label_prob
+
+
+# Function to score a whole frame in chunks with one transform and one predict_proba per chunk
+# Returns the predicted labels and churn probabilities as numpy arrays.
+def score_frame(df, preprocessor, model, chunk_size=DEFAULT_CHUNK_SIZE):
+    n_rows = len(df)
+    labels = np.empty(n_rows, dtype=np.asarray(model.classes_).dtype)
+    churn_prob = np.empty(n_rows, dtype=np.float64)
+    churn_idx = churn_class_index(model)
+
+    for start in range(0, n_rows, chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        processed = preprocessor.transform(chunk)
+        prob = model.predict_proba(processed)
+        labels[start:start + len(chunk)] = proba_labels(model, prob)[0]
+        churn_prob[start:start + len(chunk)] = prob[:, churn_idx]
+
+    return labels, churn_prob
+
+
+# Function to score an uploaded customer frame and build the downloadable result
+# Returns the result frame and the scoring throughput in rows per second.
+def bulk_predict(df, preprocessor, model, chunk_size=DEFAULT_CHUNK_SIZE):
+    aligned, _ = align_to_schema(df)
+    start = time.perf_counter()
+    labels, churn_prob = score_frame(aligned, preprocessor, model, chunk_size)
+    elapsed = time.perf_counter() - start
+
+    result = df.copy()
+    result['Prediction'] = np.where(labels == 1, 'Churn', 'No Churn')
+    result['Churn_Probability'] = churn_prob
+    result['Probability'] = np.where(labels == 1, churn_prob, 1 - churn_prob)
+    rows_per_second = len(df) / elapsed if elapsed > 0 else float('inf')
+    return result, rows_per_second
+
+
+# Function to measure the per-row path (one DataFrame, transform and predict per customer)
+# on a small sample so the bulk throughput can be compared against it.
+def per_row_rows_per_second(df, preprocessor, model, sample_size=50):
+    aligned, _ = align_to_schema(df.head(sample_size))
+    if aligned.empty:
+        return 0.0
+    start = time.perf_counter()
+    for record in aligned.to_dict(orient='records'):
+        predict_record(record, preprocessor, model)
+    elapsed = time.perf_counter() - start
+    return len(aligned) / elapsed if elapsed > 0 else float('inf')
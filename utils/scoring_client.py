@@ -0,0 +1,27 @@
+import os
+
+from utils.lazy_imports import lazy_module
+
+requests = lazy_module('requests')  # Only imported when the scoring service is used
+
+# Base URL of the scoring service (api.py); when unset the pages score in-process
+SCORING_API_URL = os.getenv("SCORING_API_URL")
+REQUEST_TIMEOUT = float(os.getenv("SCORING_API_TIMEOUT", "10"))
+
+
+# Function to check whether the pages should call the scoring service
+def use_remote_scoring():
+    return bool(SCORING_API_URL)
+
+
+# Function to score a single customer through the scoring service
+def predict_remote(attributes, model_name='random_forest'):
+    response = requests.post(
+        f"{SCORING_API_URL.rstrip('/')}/predict",
+        json={'customer': attributes, 'model': model_name},
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    result = response.json()
+    return result['prediction'], result['probability']
+
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import column, func, inspect, literal_column, select, table
+
+from utils.database import DATA_TABLE
+from utils.datasets import DN_SCHEMA, apply_schema, write_atomic, write_json
+
+# Local Parquet snapshot of the SQL churn table
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(main_dir, "datasets", "snapshot"))
+SNAPSHOT_PARTITIONS = int(os.getenv("SNAPSHOT_PARTITIONS", "16"))
+# Column that changes whenever a row changes (rowversion or last-modified timestamp).
+# Without one, SQL Server rows are compared by BINARY_CHECKSUM(*), and other databases
+# are re-read in full and compared by a hash of each row.
+SNAPSHOT_CHANGE_COLUMN = os.getenv("SNAPSHOT_CHANGE_COLUMN") or None
+SNAPSHOT_KEY_BATCH = 500  # Keys per IN (...) query when fetching changed rows
+
+KEY_COLUMN = 'Customer_ID'
+MARKER_COLUMN = '_change_marker'
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = '.sync.lock'
+
+
+# Function to assign keys to partitions with a hash that is stable across processes
+def partition_of(keys, partitions=SNAPSHOT_PARTITIONS):
+    return keys.astype(str).map(lambda key: zlib.crc32(key.encode()) % partitions)
+
+
+# Function to compute a change marker per row from the values the database returned
+# (for databases without one). Hashing the raw row tuples keeps the markers independent
+# of the dtypes pandas would infer for the whole column.
+def row_markers(rows):
+    return [hashlib.blake2b(repr(tuple(row)).encode(), digest_size=8).hexdigest() for row in rows]
+
+
+# Function to read the snapshot manifest (None if there is no snapshot yet)
+def read_manifest(directory=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Function to hold an exclusive lock on a file for the duration of a block
+# The lock is taken on an open file, so it serializes threads and processes alike.
+@contextmanager
+def file_lock(path):
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class SnapshotSync:
+    # Keeps a partitioned Parquet copy of the SQL table up to date.
+    # Each sync reads only Customer_ID and a change marker per row, compares them with the
+    # markers stored in the snapshot, and fetches just the new or changed rows. Only the
+    # partitions holding changed or deleted keys are rewritten, to new file names; the
+    # manifest listing the current files is then replaced atomically, so readers always
+    # see a complete snapshot. Files replaced by a sync are kept until the sync after it,
+    # so a reader that read the previous manifest can still open them, and a file lock
+    # in the snapshot directory lets only one sync run at a time.
+
+    def __init__(self, engine, table_name=DATA_TABLE, directory=SNAPSHOT_DIR,
+                 change_column=SNAPSHOT_CHANGE_COLUMN, partitions=SNAPSHOT_PARTITIONS):
+        self.engine = engine
+        self.directory = directory
+        self.change_column = change_column
+        self.partitions = partitions
+        schema, _, name = table_name.rpartition('.')
+        columns = [col['name'] for col in inspect(engine).get_columns(name, schema=schema or None)]
+        self.table = table(name, *[column(col) for col in columns], schema=schema or None)
+
+    # Function to return the SQL expression of the per-row change marker, or None
+    def marker_expression(self):
+        if self.change_column:
+            return self.table.c[self.change_column]
+        if self.engine.dialect.name == 'mssql':
+            return func.binary_checksum(literal_column('*'))
+        return None
+
+    # Function to read the keys and markers stored in the snapshot
+    def _local_markers(self, manifest):
+        frames = [
+            pd.read_parquet(os.path.join(self.directory, entry['file']), columns=[KEY_COLUMN, MARKER_COLUMN])
+            for entry in manifest['partitions'].values()
+        ]
+        if not frames:
+            return pd.Series(dtype=str)
+        local = pd.concat(frames, ignore_index=True)
+        return pd.Series(local[MARKER_COLUMN].to_numpy(), index=local[KEY_COLUMN].astype(str))
+
+    # Function to fetch the full rows of the given keys, a batch of keys per query
+    def _fetch_rows(self, conn, keys):
+        key = self.table.c[KEY_COLUMN]
+        frames = []
+        for i in range(0, len(keys), SNAPSHOT_KEY_BATCH):
+            batch = list(keys[i:i + SNAPSHOT_KEY_BATCH])
+            result = conn.execute(select(self.table).where(key.in_(batch)))
+            frames.append(pd.DataFrame(result.fetchall(), columns=list(result.keys())))
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    # Function to bring the snapshot up to date; returns a summary of what was done
+    # Waits for a sync already running in another thread or process to finish first.
+    def sync(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(os.path.join(self.directory, LOCK_NAME)):
+            return self._sync()
+
+    def _sync(self):
+        start = time.perf_counter()
+        manifest = previous = read_manifest(self.directory)
+        if manifest is not None and manifest.get('partition_count') != self.partitions:
+            manifest = None  # Partitioning changed: rebuild
+        local = self._local_markers(manifest) if manifest else pd.Series(dtype=str)
+
+        marker = self.marker_expression()
+        with self.engine.connect() as conn:
+            if marker is None or manifest is None:
+                # Full read: first sync, or no marker available in the database
+                result = conn.execute(select(self.table, *([marker.label(MARKER_COLUMN)] if marker is not None else [])))
+                rows = result.fetchall()
+                remote_rows = pd.DataFrame(rows, columns=list(result.keys()))
+                if marker is None:
+                    remote_rows[MARKER_COLUMN] = row_markers(rows)
+                remote_rows[MARKER_COLUMN] = remote_rows[MARKER_COLUMN].astype(str)
+                remote = pd.Series(remote_rows[MARKER_COLUMN].to_numpy(), index=remote_rows[KEY_COLUMN].astype(str))
+                changed_keys = remote.index[local.reindex(remote.index).to_numpy() != remote.to_numpy()]
+                changed = remote_rows[remote_rows[KEY_COLUMN].astype(str).isin(changed_keys)]
+                pulled = len(remote_rows)
+            else:
+                result = conn.execute(select(self.table.c[KEY_COLUMN], marker.label(MARKER_COLUMN)))
+                remote = pd.DataFrame(result.fetchall(), columns=[KEY_COLUMN, MARKER_COLUMN])
+                remote = pd.Series(remote[MARKER_COLUMN].astype(str).to_numpy(), index=remote[KEY_COLUMN].astype(str))
+                changed_keys = remote.index[local.reindex(remote.index).to_numpy() != remote.to_numpy()]
+                changed = self._fetch_rows(conn, changed_keys)
+                if changed is not None:
+                    # Use the markers read above so a row changing in between is picked up next time
+                    changed[MARKER_COLUMN] = remote.reindex(changed[KEY_COLUMN].astype(str)).to_numpy()
+                pulled = len(changed_keys)
+        deleted_keys = local.index.difference(remote.index)
+
+        summary = {'changed': len(changed_keys), 'deleted': len(deleted_keys), 'rows_pulled': pulled, 'partitions_written': 0}
+        if manifest is not None and not len(changed_keys) and not len(deleted_keys):
+            summary['seconds'] = time.perf_counter() - start
+            return summary
+
+        # Rewrite only the partitions with changed or deleted keys
+        changed = changed if changed is not None else pd.DataFrame(columns=[KEY_COLUMN, MARKER_COLUMN])
+        touched_keys = pd.Index(changed_keys).append(deleted_keys)
+        new_partitions = partition_of(changed[KEY_COLUMN], self.partitions) if len(changed) else pd.Series(dtype=int)
+        affected = set(partition_of(pd.Series(touched_keys, dtype=str), self.partitions)) if len(touched_keys) else set()
+        version = (previous['version'] + 1) if previous else 1  # Never reuse a kept file's name
+        entries = dict(manifest['partitions']) if manifest else {}
+        for part in sorted(affected):
+            frames = []
+            old = entries.get(str(part))
+            if old is not None:
+                old_frame = pd.read_parquet(os.path.join(self.directory, old['file']))
+                frames.append(old_frame[~old_frame[KEY_COLUMN].astype(str).isin(touched_keys)])
+            frames.append(changed[new_partitions.to_numpy() == part])
+            part_frame = pd.concat([frame for frame in frames if len(frame)], ignore_index=True) if any(len(frame) for frame in frames) else None
+            if part_frame is None:
+                entries.pop(str(part), None)
+                continue
+            file_name = f"part-{part:03d}-v{version}.parquet"
+            write_atomic(os.path.join(self.directory, file_name), lambda tmp: part_frame.to_parquet(tmp, index=False))
+            entries[str(part)] = {'file': file_name, 'rows': len(part_frame)}
+            summary['partitions_written'] += 1
+
+        new_manifest = {
+            'version': version,
+            'synced_at': time.time(),
+            'partition_count': self.partitions,
+            'rows': sum(entry['rows'] for entry in entries.values()),
+            'partitions': entries,
+        }
+        write_atomic(os.path.join(self.directory, MANIFEST_NAME), lambda tmp: write_json(tmp, new_manifest))
+
+        # Remove files listed by neither this manifest nor the one it replaced; the latter
+        # stay until the next sync for readers that are still loading them
+        keep = {entry['file'] for entry in entries.values()}
+        if previous is not None:
+            keep |= {entry['file'] for entry in previous['partitions'].values()}
+        for name in os.listdir(self.directory):
+            if name.startswith('part-') and name.endswith('.parquet') and name not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        summary['seconds'] = time.perf_counter() - start
+        return summary
+
+
+class SnapshotLoader:
+    # Reads the snapshot for the dashboard and bulk scoring, like DatasetLoader reads the CSV:
+    # once per manifest version, with the dn.csv dtypes applied.
+
+    def __init__(self, directory=SNAPSHOT_DIR, schema=DN_SCHEMA):
+        self.directory = directory
+        self.schema = schema
+        self._lock = threading.Lock()
+        self._frame = None
+        self._signature = None
+        self.version = None
+        self.source = 'snapshot'
+        self.last_append = None
+
+    def get(self):
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        stat = os.stat(manifest_path)  # FileNotFoundError until the first sync
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._frame is not None and signature == self._signature:
+            return self._frame
+        with self._lock:
+            if self._frame is None or signature != self._signature:
+                with open(manifest_path, 'rb') as f:
+                    raw = f.read()
+                manifest = json.loads(raw)
+                frames = [pd.read_parquet(os.path.join(self.directory, entry['file'])) for entry in manifest['partitions'].values()]
+                frame = pd.concat(frames, ignore_index=True).drop(columns=[MARKER_COLUMN])
+                self._frame = apply_schema(frame.sort_values(KEY_COLUMN, ignore_index=True), self.schema)
+                self.version = 'snapshot-' + hashlib.sha256(raw).hexdigest()
+                self._signature = signature
+        return self._frame
+
+
+# Process-wide snapshot loaders, one per directory
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+# Function to get the shared snapshot loader
+def get_snapshot_loader(directory=SNAPSHOT_DIR):
+    with _loaders_lock:
+        if directory not in _loaders:
+            _loaders[directory] = SnapshotLoader(directory)
+        return _loaders[directory]
+
+
+# Sync the snapshot from the configured database, once or every --every seconds
+if __name__ == '__main__':
+    import argparse
+
+    from utils.database import create_pooled_engine
+
+    parser = argparse.ArgumentParser(description="Sync the local Parquet snapshot of the SQL churn table.")
+    parser.add_argument('--every', type=float, default=0, help="Repeat every N seconds (0 syncs once)")
+    parser.add_argument('--url', default=None, help="Database URL (default: pages/.env or DATABASE_URL)")
+    parser.add_argument('--table', default=DATA_TABLE)
+    parser.add_argument('--directory', default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    sync = SnapshotSync(create_pooled_engine(args.url), args.table, args.directory)
+    while True:
+        print(sync.sync())
+        if not args.every:
+            break
+        time.sleep(args.every)
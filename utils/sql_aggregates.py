@@ -0,0 +1,117 @@
+import hashlib
+
+import pandas as pd
+from sqlalchemy import Integer, cast, func, select
+
+from utils.aggregates import HISTOGRAM_BIN_WIDTHS, AggregateCube, plain_index
+from utils.data_browser import get_data_browser
+from utils.database import get_engine
+from utils.datasets import apply_schema
+
+
+# Function to run one GROUP BY through the browser's query cache
+# Key columns get the dn.csv dtypes (e.g. 0/1 to booleans) so the result matches the
+# tables AggregateCube.partials() computes from raw rows.
+def grouped(browser, keys, aggregates, where=(), statuses=None):
+    t = browser.table
+    group_columns = [t.c[key] for key in keys]
+    statement = (
+        select(*group_columns, *aggregates)
+        .where(*[c.is_not(None) for c in group_columns], *where)
+        .group_by(*group_columns)
+    )
+    frame, status = browser.read(statement)
+    if statuses is not None:
+        statuses.append(status)
+    frame = pd.concat([apply_schema(frame[keys]), frame.drop(columns=keys)], axis=1)
+    return frame.set_index(keys)
+
+
+# Function to build the EDA cube from GROUP BY queries instead of raw rows
+# Returns (cube, version, cache statuses); only the small aggregated frames are transferred.
+def cube_from_sql(browser):
+    t = browser.table
+    columns = set(browser.columns)
+    count = func.count().label('count')
+    statuses = []
+    tables = {}
+
+    for col in ['Contract', 'Gender', 'Senior_Citizen']:
+        if col in columns:
+            tables[col] = grouped(browser, [col], [count], statuses=statuses)['count'].rename(None)
+    if {'Payment_Method', 'Churn'} <= columns:
+        tables['payment_churn'] = grouped(browser, ['Payment_Method', 'Churn'], [count], statuses=statuses)['count'].rename(None)
+    if {'Partner', 'Churn', 'Tenure_Months', 'Monthly_Charges'} <= columns:
+        sums = [func.sum(t.c.Tenure_Months).label('sum_tenure'), func.sum(t.c.Monthly_Charges).label('sum_monthly')]
+        table = grouped(browser, ['Partner', 'Churn'], [count, *sums], statuses=statuses)
+        tables['partner_churn'] = table.rename(columns={'sum_tenure': 'Tenure_Months', 'sum_monthly': 'Monthly_Charges'})
+    if {'Tenure_Months', 'Total_Charges'} <= columns:
+        table = grouped(
+            browser, ['Tenure_Months'], [count, func.sum(t.c.Total_Charges).label('sum_total')],
+            where=[t.c.Total_Charges.is_not(None)], statuses=statuses,
+        )
+        tables['tenure_total'] = table.rename(columns={'sum_total': 'Total_Charges'})
+    for col, width in HISTOGRAM_BIN_WIDTHS.items():
+        if col in columns:
+            # Charges are non-negative, so truncating to an integer equals floor()
+            bin_column = cast(t.c[col] / width, Integer).label('bin')
+            statement = select(bin_column, count).where(t.c[col].is_not(None)).group_by(bin_column)
+            frame, status = browser.read(statement)
+            statuses.append(status)
+            tables[f'{col}_hist'] = pd.Series(frame['count'].to_numpy(), index=frame['bin'].astype('int64').to_numpy(), name='count').sort_index()
+
+    tables = {name: plain_index(table.astype('float64') if name in ('partner_churn', 'tenure_total') else table.astype('int64'))
+              for name, table in tables.items()}
+    for name in ('partner_churn', 'tenure_total'):
+        if name in tables:
+            tables[name]['count'] = tables[name]['count'].astype('int64')
+    cube = AggregateCube(tables)
+    cube.row_count = browser.count()
+
+    digest = hashlib.sha256()
+    for name in sorted(tables):
+        digest.update(name.encode())
+        digest.update(tables[name].sort_index().to_json().encode())
+    return cube, 'sql-' + digest.hexdigest(), statuses
+
+
+# Function to get the cube of the database table configured for the data page
+def get_sql_aggregate_cube(engine=None):
+    return cube_from_sql(get_data_browser(engine or get_engine()))
+
+
+# Check the SQL cube against the cube computed from dn.csv, using a SQLite copy of it
+if __name__ == '__main__':
+    import argparse
+    import os
+    import sys
+    import tempfile
+
+    from utils.data_browser import DataBrowser
+    from utils.database import create_pooled_engine
+    from utils.datasets import DEFAULT_DATASET_PATH, load_dataset
+
+    parser = argparse.ArgumentParser(description="Compare SQL GROUP BY aggregates with the pandas cube on a SQLite copy of dn.csv.")
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_pooled_engine(f"sqlite:///{os.path.join(tmp, 'churn.db')}")
+        pd.read_csv(args.dataset).to_sql('churn', engine, index=False)
+        sql_cube, version, _ = cube_from_sql(DataBrowser(engine, 'churn'))
+        engine.dispose()
+
+    expected = AggregateCube.from_frame(load_dataset(args.dataset))
+    mismatches = 0
+    for name, table in expected.tables.items():
+        try:
+            if isinstance(table, pd.Series):
+                pd.testing.assert_series_equal(table.sort_index(), sql_cube.tables[name].sort_index(), check_dtype=False)
+            else:
+                pd.testing.assert_frame_equal(table.sort_index(), sql_cube.tables[name].sort_index(), check_dtype=False)
+            print(f"{name:<20} match")
+        except (AssertionError, KeyError) as e:
+            mismatches += 1
+            print(f"{name:<20} MISMATCH: {e}")
+    print(f"rows: {sql_cube.row_count:,} (pandas {expected.row_count:,}), version {version[:16]}")
+    sys.exit(1 if mismatches or sql_cube.row_count != expected.row_count else 0)
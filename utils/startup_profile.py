@@ -0,0 +1,140 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+# Pages profiled by `python -m utils.startup_profile`, by name
+main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = {
+    'app': 'app.py',
+    'about': os.path.join('pages', 'about.py'),
+    'dashboard': os.path.join('pages', 'dashboard.py'),
+    'data': os.path.join('pages', 'data.py'),
+    'history': os.path.join('pages', 'history.py'),
+    'prediction': os.path.join('pages', 'prediction.py'),
+}
+
+# Libraries a page must not import on its first run with the default settings
+# (CSV dashboard, Altair charts, local scoring, no export or bulk scoring yet);
+# tests/test_startup_imports.py checks these with DEFAULT_ENV
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'sqlalchemy', 'pyodbc', 'pyarrow', 'joblib', 'sklearn', 'xgboost', 'requests']
+FORBIDDEN_IMPORTS = {
+    'app': HEAVY_MODULES,
+    'about': HEAVY_MODULES,
+    'dashboard': ['matplotlib', 'seaborn', 'sqlalchemy', 'pyodbc', 'joblib', 'sklearn', 'xgboost', 'requests'],
+    'history': ['matplotlib', 'seaborn', 'sqlalchemy', 'pyodbc', 'joblib', 'sklearn', 'xgboost', 'requests'],
+    'prediction': ['matplotlib', 'seaborn', 'sqlalchemy', 'pyodbc', 'requests'],
+}
+
+# Settings that would make a page import more than its defaults do
+DEFAULT_ENV = {'DASHBOARD_SOURCE': 'csv', 'CHART_BACKEND': 'altair', 'SCORING_API_URL': ''}
+
+MARKER = '### startup_profile'
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+# Runs one page with AppTest; the markers separate Streamlit's own imports from the page's
+RUNNER = f"""
+import sys, time
+from streamlit.testing.v1 import AppTest
+sys.stderr.write('{MARKER} start\\n')
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+sys.stderr.write('{MARKER} end %.1f\\n' % ((time.perf_counter() - start) * 1000))
+"""
+
+# Runs one page with AppTest and prints, as JSON, the modules its first run imported,
+# its exceptions and errors, and the headings and widget labels it rendered
+MODULES_RUNNER = f"""
+import json, sys
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+rendered = [el.value for kind in ('title', 'header', 'subheader', 'markdown') for el in getattr(at, kind)]
+rendered += [el.label for kind in ('radio', 'toggle', 'button', 'selectbox') for el in getattr(at, kind)]
+print('{MARKER} run')
+print(json.dumps({{
+    'modules': sorted(set(sys.modules) - before),
+    'exceptions': [el.value for el in at.exception],
+    'errors': [el.value for el in at.error],
+    'rendered': rendered,
+}}))
+"""
+
+
+# Function to parse `-X importtime` lines into (self_us, cumulative_us, depth, module)
+def parse_importtime(lines):
+    imports = []
+    for line in lines:
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((int(self_us), int(cumulative_us), len(indent) // 2, module))
+    return imports
+
+
+# Function to profile the first run of a page in a fresh interpreter
+# Returns the page's imports, the total import time and the wall time of the run.
+def profile_page(page, env=None):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', RUNNER, os.path.join(main_dir, PAGES[page])],
+        cwd=main_dir, capture_output=True, text=True, env={**os.environ, **(env or {})},
+    )
+    lines = result.stderr.splitlines()
+    starts = [i for i, line in enumerate(lines) if line.startswith(f'{MARKER} start')]
+    ends = [i for i, line in enumerate(lines) if line.startswith(f'{MARKER} end')]
+    if not starts or not ends:
+        raise RuntimeError(f"Profiling {page} failed:\n{result.stderr[-2000:]}")
+    imports = parse_importtime(lines[starts[0] + 1:ends[0]])
+    return {
+        'page': page,
+        'imports': imports,
+        'import_ms': sum(imp[0] for imp in imports) / 1000,
+        'run_ms': float(lines[ends[0]].split()[-1]),
+        'heavy': sorted({imp[3].split('.')[0] for imp in imports} & set(HEAVY_MODULES)),
+    }
+
+
+# Function to run a page's first run in a fresh interpreter
+# Returns the top-level packages it imported, its exceptions and st.error messages, and
+# the headings and widget labels it rendered (to tell a full run from an early stop).
+def run_page(page, env=None):
+    result = subprocess.run(
+        [sys.executable, '-c', MODULES_RUNNER, os.path.join(main_dir, PAGES[page])],
+        cwd=main_dir, capture_output=True, text=True, env={**os.environ, **(env or {})},
+    )
+    lines = result.stdout.splitlines()
+    if f'{MARKER} run' not in lines:
+        raise RuntimeError(f"Running {page} failed:\n{result.stderr[-2000:]}")
+    run = json.loads(lines[lines.index(f'{MARKER} run') + 1])
+    run['modules'] = sorted({module.split('.')[0] for module in run['modules']})
+    return run
+
+
+# Report import time per page in `-X importtime` form
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile the imports each page makes on its first run in a fresh process.")
+    parser.add_argument('pages', nargs='*', default=list(PAGES), help=f"Pages to profile: {', '.join(PAGES)} (default all)")
+    parser.add_argument('--top', type=int, default=10, help="Slowest top-level imports to list per page")
+    args = parser.parse_args()
+    unknown = set(args.pages) - set(PAGES)
+    if unknown:
+        parser.error(f"unknown pages: {', '.join(sorted(unknown))}")
+
+    profiles = []
+    for page in args.pages:
+        profile = profile_page(page)
+        profiles.append(profile)
+
+        print(f"== {page} ({PAGES[page]})")
+        print("import time: self [us] | cumulative | imported package")
+        top_level = [imp for imp in profile['imports'] if imp[2] == 0]
+        for self_us, cumulative_us, _, module in sorted(top_level, key=lambda imp: -imp[1])[:args.top]:
+            print(f"import time: {self_us:>9} | {cumulative_us:>10} | {module}")
+        print()
+
+    print(f"{'page':<12} {'import_ms':>10} {'run_ms':>9}  heavy imports")
+    for profile in profiles:
+        print(f"{profile['page']:<12} {profile['import_ms']:>10.0f} {profile['run_ms']:>9.0f}  {', '.join(profile['heavy']) or '-'}")
@@ -0,0 +1,347 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.datasets import DEFAULT_DATASET_PATH
+from utils.scoring import dataset_to_expected
+
+# Compiled tree-ensemble inference for the random_forest and xgboost models, opt-in with
+# TREE_ENGINE=1. Compiling copies every tree into arrays private to the process, so with
+# several workers the forest is no longer shared through the memory-mapped bundle.
+TREE_ENGINE = os.getenv("TREE_ENGINE", "0") == "1"
+# Batches larger than a model's limit go to the native predict_proba, whose compiled
+# loops (and xgboost's threads) win once the per-call overhead is small compared with
+# the work. The limit is measured per model when it is compiled unless set here.
+TREE_ENGINE_MAX_BATCH = int(os.getenv("TREE_ENGINE_MAX_BATCH", "0")) or None
+CALIBRATION_BATCH_SIZES = [1, 8, 32, 128, 512]
+# Tolerance for the equivalence check against the native predict_proba
+TREE_ENGINE_ATOL = 1e-6
+# Most (tree, row) pairs traversed at once; bounds the temporary index arrays
+TRAVERSAL_BLOCK = 2_000_000
+
+
+class FlatTrees:
+    # All trees of an ensemble in flat node arrays, one entry per node.
+    # Traversal works on (tree, row) pairs: each step moves every pair one level down
+    # with a few vectorized gathers. Leaves are their own children, so pairs that have
+    # arrived stay put; once they are a quarter of the pairs still moving they are
+    # dropped, which saves the deep forest trees from stepping every pair to max_depth.
+
+    def __init__(self, children, feature, threshold, missing_left, values, roots, max_depth, strict):
+        self.children = children  # children[2 * node + go_left]: right child, then left child
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.values = values  # (n_nodes, n_outputs), only read at leaves
+        self.roots = roots
+        self.max_depth = max_depth
+        self.strict = strict  # xgboost goes left on x < threshold, sklearn on x <= threshold
+        self.is_leaf = children[0::2] == np.arange(len(feature))
+
+    # Function to flatten per-tree arrays (local child indices, -1 for leaves) into one set
+    @classmethod
+    def from_trees(cls, trees, strict):
+        offsets = np.cumsum([0] + [len(tree['left']) for tree in trees])
+        concat = lambda key: np.concatenate([tree[key] for tree in trees])
+        left, right = [], []
+        for offset, tree in zip(offsets, trees):
+            own = np.arange(len(tree['left'])) + offset
+            is_leaf = tree['left'] < 0
+            left.append(np.where(is_leaf, own, tree['left'] + offset))
+            right.append(np.where(is_leaf, own, tree['right'] + offset))
+        feature = concat('feature')
+        return cls(
+            np.column_stack([np.concatenate(right), np.concatenate(left)]).ravel().astype(np.int32),
+            np.where(feature < 0, 0, feature).astype(np.int32),
+            concat('threshold').astype(np.float32),
+            concat('missing_left').astype(bool),
+            concat('values'),
+            offsets[:-1].astype(np.int32),
+            max(tree['depth'] for tree in trees),
+            strict,
+        )
+
+    # Function to find the leaf each row reaches in each tree: (n_trees, n_rows) node indices
+    # X must be a C-contiguous float32 matrix.
+    def apply(self, X):
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        has_nan = bool(np.isnan(flat_x).any())
+        leaves = np.repeat(self.roots, n_rows)
+        # Pairs still moving: position in leaves, current node and row offset in flat_x
+        pair = np.arange(len(leaves))
+        node = leaves.copy()
+        row = (pair % n_rows) * n_features
+        for _ in range(self.max_depth):
+            x = flat_x[row + self.feature[node]]
+            threshold = self.threshold[node]
+            go_left = x < threshold if self.strict else x <= threshold
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left[node], go_left)
+            node = self.children[2 * node + go_left]
+            done = self.is_leaf[node]
+            finished = np.count_nonzero(done)
+            if finished == len(node):
+                break
+            if finished * 4 >= len(node):
+                leaves[pair[done]] = node[done]
+                moving = ~done
+                pair, node, row = pair[moving], node[moving], row[moving]
+        leaves[pair] = node
+        return leaves.reshape(len(self.roots), n_rows)
+
+    # Function to sum the leaf values each row reaches over all trees: (n_rows, n_outputs)
+    def leaf_sum(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        block = max(1, TRAVERSAL_BLOCK // len(self.roots))
+        out = np.empty((X.shape[0], self.values.shape[1]))
+        for start in range(0, X.shape[0], block):
+            leaves = self.apply(X[start:start + block])
+            out[start:start + block] = self.values[leaves].sum(axis=0)
+        return out
+
+
+# Function to round float64 thresholds down to float32 so that, for float32 features,
+# x <= float32 threshold holds exactly when x <= float64 threshold (sklearn's comparison)
+def float32_thresholds(threshold):
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+# Function to compile a fitted RandomForestClassifier
+# Leaf values are the class fractions, as in DecisionTreeClassifier.predict_proba.
+def compile_forest(model):
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise NotImplementedError("Multi-output forests are not supported")
+        values = tree.value[:, 0, :].astype(np.float64)
+        totals = values.sum(axis=1, keepdims=True)
+        values = values / np.where(totals == 0, 1, totals)
+        trees.append({
+            'left': tree.children_left,
+            'right': tree.children_right,
+            'feature': tree.feature,
+            'threshold': float32_thresholds(tree.threshold),
+            'missing_left': getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8)),
+            'values': values,
+            'depth': tree.max_depth,
+        })
+    return FlatTrees.from_trees(trees, strict=False)
+
+
+# Function to compile the booster of a fitted binary:logistic XGBClassifier
+# Reads the exact float32 split conditions and leaf weights from the JSON model.
+def compile_booster(model):
+    raw = json.loads(model.get_booster().save_raw(raw_format='json'))
+    learner = raw['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise NotImplementedError(f"Unsupported objective {learner['objective']['name']}")
+    booster = learner['gradient_booster']
+    if booster['name'] != 'gbtree':
+        raise NotImplementedError(f"Unsupported booster {booster['name']}")
+    if getattr(model, 'best_iteration', None) is not None:
+        raise NotImplementedError("Early-stopped boosters are not supported")
+
+    trees = []
+    for tree in booster['model']['trees']:
+        if any(tree['split_type']):
+            raise NotImplementedError("Categorical splits are not supported")
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        right = np.asarray(tree['right_children'], dtype=np.int64)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        is_leaf = left < 0
+        depth = np.zeros(len(left), dtype=np.int64)
+        for node in range(len(left)):  # Parents come before their children
+            if not is_leaf[node]:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+        trees.append({
+            'left': left,
+            'right': right,
+            'feature': np.where(is_leaf, -1, np.asarray(tree['split_indices'])),
+            'threshold': conditions,
+            'missing_left': np.asarray(tree['default_left'], dtype=bool),
+            'values': np.where(is_leaf, conditions, 0).astype(np.float32)[:, None],
+            'depth': int(depth.max()),
+        })
+    flat = FlatTrees.from_trees(trees, strict=True)
+    base_score = float(learner['learner_model_param']['base_score'])
+    return flat, float(np.log(base_score / (1 - base_score)))
+
+
+class CompiledTreeModel:
+    # Stands in for a tree ensemble in tuned_models: predict_proba and predict evaluate
+    # the flat node arrays for batches up to TREE_ENGINE_MAX_BATCH rows and hand larger
+    # batches (or anything the engine fails on) to the original model.
+
+    def __init__(self, native):
+        self.native = native
+        self.classes_ = native.classes_
+        self.kind = type(native).__name__
+        if self.kind == 'RandomForestClassifier':
+            self.trees = compile_forest(native)
+            self.base_margin = None
+        elif self.kind == 'XGBClassifier':
+            self.trees, self.base_margin = compile_booster(native)
+        else:
+            raise NotImplementedError(f"Unsupported model {self.kind}")
+        self.max_batch = TREE_ENGINE_MAX_BATCH or 1
+        self.compiled_calls = 0
+        self.native_calls = 0
+
+    # Function to evaluate the compiled ensemble on a dense matrix
+    def compiled_proba(self, X):
+        if hasattr(X, 'toarray'):
+            X = X.toarray()  # Rows are only ever the preprocessor's dense encoding
+        # Both libraries evaluate trees on float32 features
+        if self.base_margin is None:
+            return self.trees.leaf_sum(X) / len(self.trees.roots)
+        margin = self.trees.leaf_sum(X)[:, 0] + self.base_margin
+        churn = 1.0 / (1.0 + np.exp(-margin))
+        return np.column_stack([1 - churn, churn])
+
+    def predict_proba(self, X):
+        if X.shape[0] <= self.max_batch:
+            try:
+                proba = self.compiled_proba(X)
+                self.compiled_calls += 1
+                return proba
+            except Exception:
+                pass
+        self.native_calls += 1
+        return self.native.predict_proba(X)
+
+    def predict(self, X):
+        return np.asarray(self.classes_)[self.predict_proba(X).argmax(axis=1)]
+
+    # Function to find the largest batch size at which the compiled path is still faster
+    def calibrate(self, X, runs=5):
+        limit = 1
+        for batch_size in CALIBRATION_BATCH_SIZES:
+            batch = X[np.arange(batch_size) % X.shape[0]]
+            timings = []
+            for fn in (self.native.predict_proba, self.compiled_proba):
+                fn(batch)
+                # Fastest of several calls, so a stray slow call does not decide the limit
+                fastest = float('inf')
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    fn(batch)
+                    fastest = min(fastest, time.perf_counter() - start)
+                timings.append(fastest)
+            if timings[1] >= timings[0]:
+                break
+            limit = batch_size
+        self.max_batch = limit
+        return limit
+
+    # Anything else (feature_importances_, get_params, ...) comes from the original model
+    def __getattr__(self, name):
+        if name == 'native':
+            raise AttributeError(name)
+        return getattr(self.native, name)
+
+
+# Function to compare the compiled and native probabilities on a feature matrix
+# Returns (matches, max_abs_diff).
+def verify_compiled(compiled, X):
+    expected = np.asarray(compiled.native.predict_proba(X), dtype=np.float64)
+    actual = compiled.compiled_proba(X)
+    if expected.shape != actual.shape:
+        return False, float('inf')
+    max_diff = float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+    return max_diff <= TREE_ENGINE_ATOL, max_diff
+
+
+# Function to compile a model and check it against datasets/dn.csv
+# Returns (CompiledTreeModel or None, status message); None means the native model is used.
+def build_tree_engine(model, preprocessor, dataset_path=DEFAULT_DATASET_PATH):
+    try:
+        compiled = CompiledTreeModel(model)
+        X = preprocessor.transform(dataset_to_expected(pd.read_csv(dataset_path)))
+        matches, max_diff = verify_compiled(compiled, X)
+    except Exception as e:
+        return None, f"native ({e})"
+    if not matches:
+        return None, f"native (max difference {max_diff:.3g} on {os.path.basename(dataset_path)})"
+    if TREE_ENGINE_MAX_BATCH is None:
+        compiled.calibrate(X)
+    return compiled, f"compiled up to {compiled.max_batch} rows per call (verified on {X.shape[0]:,} rows, max difference {max_diff:.3g})"
+
+
+# Compiled models per model bundle version, shared across sessions
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+# Function to get tuned_models with the tree ensembles replaced by verified compiled ones
+# Returns (models, {model name: status message}); models the engine does not cover,
+# or that failed verification, are the originals.
+def get_tree_models(registry):
+    version = registry.version
+    with _engines_lock:
+        if version not in _engines:
+            components = registry.get()
+            preprocessor = components['preprocessing']['preprocessor']
+            models = dict(components['tuned_models'])
+            statuses = {}
+            if TREE_ENGINE:
+                for name, model in components['tuned_models'].items():
+                    if type(model).__name__ in ('RandomForestClassifier', 'XGBClassifier'):
+                        compiled, statuses[name] = build_tree_engine(model, preprocessor)
+                        if compiled is not None:
+                            models[name] = compiled
+            _engines.clear()
+            _engines[version] = (models, statuses)
+        return _engines[version]
+
+
+# Verify the compiled ensembles and benchmark them against the native predict_proba
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    from utils.model_registry import load_components
+
+    parser = argparse.ArgumentParser(description="Compare the compiled tree engine with the native random_forest and xgboost models.")
+    parser.add_argument('--bundle', default=None, help="Bundle to load (default: MODEL_BUNDLE_PATH or the current build)")
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 100_000])
+    args = parser.parse_args()
+
+    components = load_components(args.bundle)
+    preprocessor = components['preprocessing']['preprocessor']
+    X = preprocessor.transform(dataset_to_expected(pd.read_csv(args.dataset)))
+    X = X.toarray() if hasattr(X, 'toarray') else np.asarray(X)
+
+    failures = 0
+    print(f"{'model':<14} {'batch':>7} {'native_ms':>10} {'compiled_ms':>12} {'speedup':>8} {'max_diff':>10}")
+    for name, model in components['tuned_models'].items():
+        if type(model).__name__ not in ('RandomForestClassifier', 'XGBClassifier'):
+            continue
+        compiled = CompiledTreeModel(model)
+        matches, max_diff = verify_compiled(compiled, X)
+        failures += not matches
+        for batch_size in args.batch_sizes:
+            batch = X[np.arange(batch_size) % len(X)]
+            runs = max(3, min(200, 20_000 // batch_size))
+            timings = {}
+            for label, fn in [('native', model.predict_proba), ('compiled', compiled.compiled_proba)]:
+                fn(batch)
+                start = time.perf_counter()
+                for _ in range(runs):
+                    fn(batch)
+                timings[label] = (time.perf_counter() - start) / runs * 1000
+            diff = float(np.max(np.abs(model.predict_proba(batch) - compiled.compiled_proba(batch))))
+            print(f"{name:<14} {batch_size:>7,} {timings['native']:>10.3f} {timings['compiled']:>12.3f} "
+                  f"{timings['native'] / timings['compiled']:>7.1f}x {diff:>10.2g}")
+        print(f"{name:<14} verified on {len(X):,} rows: matches={matches} max_abs_diff={max_diff:.3g}, "
+              f"compiled path used up to {compiled.calibrate(X)} rows per call")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+
+# SQLite database holding the user accounts, and the legacy JSON file it replaces
+USER_DB_PATH = os.getenv("USER_DB_PATH", "users.db")
+LEGACY_USERS_JSON = os.getenv("LEGACY_USERS_JSON", "users.json")
+
+
+class UserStore:
+    # User accounts in an indexed SQLite table (WAL mode).
+    # username is the primary key of a WITHOUT ROWID table, so lookups are B-tree
+    # O(log n) and a duplicate signup fails atomically on the constraint.
+
+    def __init__(self, path=USER_DB_PATH, legacy_json_path=LEGACY_USERS_JSON):
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, password TEXT NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.migrate_from_json()
+
+    # Function to get this thread's connection (sqlite3 connections are not shared across threads)
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    # Function to import users.json once; later runs see the marker in the meta table
+    def migrate_from_json(self):
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return 0
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'users_json_migrated'").fetchone():
+                return 0
+            with open(self.legacy_json_path, 'r') as f:
+                users = json.load(f).get("users", [])
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+                ((user["username"], user["password"]) for user in users),
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('users_json_migrated', ?)",
+                (os.path.abspath(self.legacy_json_path),),
+            )
+            return cursor.rowcount
+
+    # Function to add a user; returns False if the username already exists
+    def create_user(self, username, password_hash):
+        conn = self._connection()
+        try:
+            with conn:
+                conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password_hash))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    # Function to look up a user's password hash (None if the user does not exist)
+    def get_password_hash(self, username):
+        row = self._connection().execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+# Process-wide user stores, one per database path
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+# Function to get the shared user store
+def get_user_store(path=USER_DB_PATH):
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = UserStore(path)
+        return _stores[path]
+
+
+# Compare logins against the JSON file and the SQLite store with many users
+if __name__ == '__main__':
+    import argparse
+    import hashlib
+    import random
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark logins against users.json and the SQLite user store.")
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--logins', type=int, default=1_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'users.json')
+        users = [{"username": f"user{i}", "password": hashlib.sha256(f"pw{i}".encode()).hexdigest()} for i in range(args.users)]
+        with open(json_path, 'w') as f:
+            json.dump({"users": users}, f)
+
+        start = time.perf_counter()
+        store = UserStore(os.path.join(tmp, 'users.db'), json_path)
+        print(f"migrated {store.count():,} users in {time.perf_counter() - start:.2f} s")
+
+        names = [f"user{random.randrange(args.users)}" for _ in range(args.logins)]
+
+        # Old path: parse users.json and scan the list on every login
+        json_logins = max(1, args.logins // 100)
+        start = time.perf_counter()
+        for name in names[:json_logins]:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+            next((u for u in data["users"] if u["username"] == name), None)
+        json_ms = (time.perf_counter() - start) / json_logins * 1000
+
+        start = time.perf_counter()
+        for name in names:
+            store.get_password_hash(name)
+        sqlite_ms = (time.perf_counter() - start) / args.logins * 1000
+
+        print(f"users.json login: {json_ms:.3f} ms per login ({json_logins} logins)")
+        print(f"SQLite login:     {sqlite_ms:.3f} ms per login ({args.logins} logins)")
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+
+from utils.aggregates import get_aggregate_cube
+from utils.batching import get_prediction_batcher
+from utils.datasets import DEFAULT_DATASET_PATH, load_dataset
+from utils.fast_encoder import get_fast_encoder
+from utils.model_registry import get_registry
+from utils.scoring import dataset_to_expected, predict_record, predict_records
+from utils.tree_engine import get_tree_models
+
+# Dummy predictions per model: single-record calls, then one call with this many records
+WARMUP_PREDICTIONS = int(os.getenv("WARMUP_PREDICTIONS", "3"))
+WARMUP_BATCH_SIZE = 32
+
+
+class WarmUp:
+    # Fills the process-wide caches the pages and the API share before traffic arrives:
+    # the model bundle, the compiled encoder and tree ensembles (if enabled), the dataset and its
+    # aggregate cube, then scores a few rows of the dataset with each model so
+    # first-call allocation and xgboost initialization are paid here. ready turns True
+    # once every step succeeded.
+
+    def __init__(self, bundle_path=None, dataset_path=DEFAULT_DATASET_PATH):
+        self.bundle_path = bundle_path
+        self.dataset_path = dataset_path
+        self._lock = threading.Lock()
+        self._thread = None
+        self.ready = False
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.steps = {}
+
+    # Function to run one step and record how long it took in milliseconds
+    def _step(self, name, fn):
+        start = time.perf_counter()
+        result = fn()
+        self.steps[name] = (time.perf_counter() - start) * 1000
+        return result
+
+    # Function to run every warm-up step in this thread
+    def run(self):
+        self.started_at = time.time()
+        try:
+            registry = get_registry(self.bundle_path)
+            components = self._step('model_bundle', registry.get)
+            encoder, _ = self._step('encoder', lambda: get_fast_encoder(registry))
+            models, _ = self._step('tree_engine', lambda: get_tree_models(registry))
+            dataset = self._step('dataset', lambda: load_dataset(self.dataset_path))
+            self._step('aggregate_cube', lambda: get_aggregate_cube(self.dataset_path))
+            batcher = self._step('batcher', lambda: get_prediction_batcher(registry))
+
+            records = dataset_to_expected(dataset.head(WARMUP_BATCH_SIZE)).to_dict('records')
+            preprocessor = components['preprocessing']['preprocessor']
+            for name, model in models.items():
+                def predict(model=model, name=name):
+                    for record in records[:WARMUP_PREDICTIONS]:
+                        predict_record(record, preprocessor, model, encoder)
+                    predict_records(records, preprocessor, model, encoder)
+                    if batcher is not None:
+                        batcher.predict(records[0], name, timeout=60)
+                self._step(f'predict_{name}', predict)
+            self.ready = True
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.finished_at = time.time()
+        return self.ready
+
+    # Function to start warming up in a background thread (only once per process)
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name='warm-up', daemon=True)
+                self._thread.start()
+        return self
+
+    # Function to wait for the warm-up to finish; returns the readiness flag
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    # Function to report readiness and step timings, e.g. for a /ready endpoint
+    def status(self):
+        return {
+            'ready': self.ready,
+            'error': self.error,
+            'seconds': (self.finished_at or time.time()) - self.started_at if self.started_at else None,
+            'steps_ms': {name: round(ms, 1) for name, ms in self.steps.items()},
+        }
+
+
+# Process-wide warm-up
+_warm_up = None
+_warm_up_lock = threading.Lock()
+
+
+# Function to get the shared warm-up of this process
+def get_warm_up(bundle_path=None):
+    global _warm_up
+    with _warm_up_lock:
+        if _warm_up is None:
+            _warm_up = WarmUp(bundle_path)
+        return _warm_up
+
+
+# Run the warm-up once and print how long each step took
+if __name__ == '__main__':
+    warm_up = get_warm_up()
+    warm_up.run()
+    status = warm_up.status()
+    for name, ms in status['steps_ms'].items():
+        print(f"{name:<22} {ms:>10.1f} ms")
+    print(f"ready={status['ready']} in {status['seconds']:.2f} s" + (f" ({status['error']})" if status['error'] else ""))
+    raise SystemExit(0 if status['ready'] else 1)